@@ -1,50 +1,579 @@
-from lpsolver import intlinprog
+import asyncio
+import threading
+import time
+import tracemalloc
+
+import numpy as np
+
+from candidates import candidate_pairs, widen
+from lpsolver import IntLinProgResult, intlinprog
+from model import build_model
+from solution import decode
+from stats import SolveStats, phase
+
+
+class _Option:
+	'''An option of Structure the model is built from, kept in the slot
+	_name. Setting it drops the built model and the last solution.'''
+	def __set_name__(self, owner, name):
+		self.slot = "_" + name;
+
+	def __get__(self, struct, owner=None):
+		return self if struct is None else getattr(struct, self.slot);
+
+	def __set__(self, struct, value):
+		setattr(struct, self.slot, value);
+		struct._model = None;
+		struct._result = None;
 
 
 class Structure:
 	'''A hanging mobile structure which is a set of points and their masses'''
-	def __init__(self, nodes, mass):
-		self.nodes = nodes;
+	__slots__ = ("_nodes", "_mass", "_compact", "_neighbours", "_radius", "_pairs", "_bigm",
+				 "_model", "_order", "_num_binary", "_result", "_cold_time", "_distances", "_unit");
+	compact = _Option();
+	neighbours = _Option();
+	radius = _Option();
+	pairs = _Option();
+	bigm = _Option();
+
+	def __init__(self, nodes, mass, compact=False, neighbours=None, radius=None, bigm="constant", pairs=None):
+		self._model = None;
+		self._result = None;
+		self.nodes = nodes;   # (n, 3) array
 		self.mass = mass;     # The mass of the i-th node is self.mass[i]
+		self.compact = compact;   # one rod variable per unordered pair instead of per ordered pair
+		# rods are only offered to the k nearest neighbours and/or within radius
+		self.neighbours = neighbours;
+		self.radius = radius;
+		self.pairs = pairs;       # explicit rod candidates (a, b), a < b, instead of the above
+		self.bigm = bigm;     # "constant", "scaled" or "indicator", see model.build_model
+		self._result = None;      # the last solution, a start for resolve(); dropped with the model
+		self._cold_time = None;
+
+	@property
+	def nodes(self):
+		return self._nodes;
+
+	@nodes.setter
+	def nodes(self, nodes):
+		self._nodes = np.ascontiguousarray(nodes, dtype=float).reshape(-1, 3);
+		self._distances = None;
+		self._unit = None;
+		self._model = None;
+		self._result = None;
+
+	@property
+	def mass(self):
+		return self._mass;
+
+	@mass.setter
+	def mass(self, mass):
+		self._mass = np.ascontiguousarray(mass, dtype=float);
+		self._model = None;
+		self._result = None;
+
+	def _set_mass(self, mass):
+		'''Change the masses of the built model in place, keeping the last
+		solution as a start; only for resolve and sweep.'''
+		self._mass = np.ascontiguousarray(mass, dtype=float);
+		self.model().set_mass(self._mass);
+
+	def _geometry(self):
+		if self._distances is None:
+			p = self._nodes;
+			# one contiguous (n, n) plane per coordinate
+			d = [np.subtract.outer(p[:, k], p[:, k]) for k in range(3)];
+			square = d[0]*d[0];
+			square += d[1]*d[1];
+			square += d[2]*d[2];
+			self._distances = np.sqrt(square, out=square);
+			inverse = np.divide(1.0, square, out=np.zeros_like(square), where=square > 0);
+			self._unit = np.empty(square.shape + (3,));
+			for k in range(3):
+				np.multiply(d[k], inverse, out=self._unit[:, :, k]);
+
+	@property
+	def distances(self):
+		'''@return the (n, n) distances between the balls, computed once'''
+		self._geometry();
+		return self._distances;
+
+	@property
+	def unit(self):
+		'''@return the (n, n, 3) unit vectors, unit[a, b] points from ball b
+		to ball a, the direction in which a rod from a pulls on b'''
+		self._geometry();
+		return self._unit;
+
+	def model(self, stats=None):
+		'''@return the revision2.py formulation of this structure, built once'''
+		if self._model is None:
+			with phase(stats, "geometry"):
+				p = self._nodes;
+				pairs, geometry = self.pairs, None;
+				if pairs is None and (self.neighbours is not None or self.radius is not None):
+					pairs = candidate_pairs(p, self.neighbours, self.radius);
+				if pairs is None:
+					geometry = (self.distances, self.unit);
+			self._build(pairs, geometry, stats);
+		return self._model;
+
+	def _build(self, pairs, geometry=None, stats=None):
+		'''Build the model with the rod candidates pairs, all pairs for None'''
+		p = self._nodes;
+		# intlinprog has no indicator constraints, they become scaled big-M rows
+		bigm = "scaled" if self.bigm == "indicator" else self.bigm;
+		with phase(stats, "assembly"):
+			self._model = build_model(p[:, 0], p[:, 1], p[:, 2], self._mass, compact=self.compact,
+									  pairs=pairs, bigm=bigm, geometry=geometry);
+		model = self._model;
+		# intlinprog wants the binaries first: x, xex, f, fex
+		binary = np.array([c == "I" for c in model.ctype]);
+		self._order = np.concatenate([np.nonzero(binary)[0], np.nonzero(~binary)[0]]);
+		self._num_binary = int(binary.sum());
+
+	def _rows(self, senses):
+		'''@return the rows of the given senses in the column order of unknown()'''
+		model = self.model();
+		A = model.tocsr()[:, self._order];
+		keep = np.array([s in senses for s in model.sense], dtype=bool);
+		return A[keep], model.rhs[keep];
 
 	def internal_forces(self):
 		'''get internal forces.
-		A force is defined as a tuple: (a,b) meaning the force from a on b.
+		A force is defined as a tuple: (a,b) meaning the force from a on b,
+		in the compact formulation also the force from b on a.
 		@return a list of tuples;
 		'''
-		pass;
+		model = self.model();
+		return list(zip(model.ea.tolist(), model.eb.tolist()));
 
 	def external_forces(self):
-		'''get external forces'''
-		pass;
+		'''get external forces.
+		An external force is defined as a tuple: (a,d) meaning the force on a
+		in direction d, one of +x, -x, +y, -y, +z, -z numbered 1 to 6.
+		@return a list of tuples;
+		'''
+		n = len(self.nodes);
+		return [(a, d) for a in range(n) for d in range(1, 7)];
 
 	def inequality_constraints_ub(self):
 		'''@return A_ub, b_ub'''
-		pass;																	#
+		return self._rows("L");
 
 	def inequality_constraints_lb(self):
 		'''@return A_lb, b_lb'''
-		pass;
+		return self._rows("G");
 
 	def equality_constraints(self):
 		'''@return A_eq, b_eq'''
-		pass;
+		return self._rows("E");
 
 	def unknown(self):
-		'''build X in this method.'''
-		pass;
+		'''build X in this method.
+		@return the names of the entries of X, binaries first'''
+		model = self.model();
+		return [model.colname(k) for k in self._order];
 
 	def objective_function(self):
 		'''@return C'''
-		pass;
+		# revision2.py maximizes, intlinprog minimizes
+		return -self.model().obj[self._order];
+
+	def bounds(self):
+		'''@return lb, ub of X'''
+		model = self.model();
+		return model.lb[self._order], model.ub[self._order];
 
 	def build_intlinprog(self):
 		'''@return C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i'''
-		pass;
+		C = self.objective_function();
+		A_ub, b_ub = self.inequality_constraints_ub();
+		A_lb, b_lb = self.inequality_constraints_lb();
+		A_eq, b_eq = self.equality_constraints();
+		return C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, self._num_binary;
+
+	def decode(self, result):
+		'''@return the Solution of an intlinprog result of this structure'''
+		if result.solution is not None:
+			return result.solution;
+		with phase(result.stats, "decode"):
+			return self._decode(result);
+
+	def _decode(self, result):
+		return self._decode_vector(result.x, result.status, result.fun, result.bound);
+
+	def _decode_vector(self, x, status, fun, bound):
+		model = self.model();
+		if x is not None:
+			x, ordered = np.empty(model.num_cols), x;
+			x[self._order] = ordered;
+		return decode(model, x, status, fun, bound);
 
-	def solve(self):
+	def is_pruned(self):
+		'''@return whether some pairs of balls are not rod candidates'''
+		n = len(self.nodes);
+		pairs = self.model().num_edges // (1 if self.compact else 2);
+		return (self.neighbours is not None or self.radius is not None) and pairs < n*(n-1)//2;
+
+	def solve(self, stats=False, sink=None, trace_memory=False, **options):
+		'''options such as time_limit or node_select are passed on to intlinprog.
+		With stats the result carries a SolveStats as result.stats, which
+		is also handed to the callable sink when there is one. trace_memory
+		adds the peak memory traced by tracemalloc, which slows the solve down.
+		A pruned model is checked against the missing rods, see _widen, and
+		time_limit holds for all of its solves together.'''
+		record = SolveStats() if stats or sink is not None or trace_memory else None;
+		deadline = None if options.get("time_limit") is None else time.perf_counter() + options["time_limit"];
+		if trace_memory:
+			tracemalloc.start();
+		try:
+			result = self._solve(record, deadline, **options);
+			if self.is_pruned():
+				result = self._widen(result, record, deadline, **options);
+			peak = tracemalloc.get_traced_memory()[1] if trace_memory else None;
+		finally:
+			if trace_memory:
+				tracemalloc.stop();
+		self._result = result;
+		self._cold_time = result.time;
+		if record is not None:
+			model = self.model();
+			record.count(balls=model.n, edges=model.num_edges, rows=model.num_rows, cols=model.num_cols,
+						 nnz=model.nnz, integers=self._num_binary, nodes=result.nodes,
+						 incumbents=len(result.history), status=result.status, objective=result.fun,
+						 bound=result.bound);
+			record.history = result.history;
+			result.stats = record;
+			# decoded here, so that the stats handed to the sink have every phase
+			result.solution = self.decode(result);
+			record.finish(peak);
+			if sink is not None:
+				sink(record);
+		return result;
+
+	def _solve(self, stats, deadline=None, **options):
+		'''Build the model and solve it, with the time left to deadline, a
+		time.perf_counter() value, as its time_limit.'''
+		self.model(stats);
+		with phase(stats, "setup"):
+			C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = self.build_intlinprog();
+			bounds = self.bounds();
+		if deadline is not None:
+			options["time_limit"] = max(0.0, deadline - time.perf_counter());
+		with phase(stats, "branch_and_bound"):
+			return intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds, **options);
+
+	def _widen(self, result, stats, deadline=None, **options):
+		'''Check a pruned model against the rods it misses. While it is
+		infeasible it is built again with doubled neighbours and radius and
+		solved in the time left to deadline. Otherwise the missing rods are
+		priced with the equilibrium duals of the LP relaxation, as in
+		colgen.py: a mobile with a missing rod costs at least the LP bound
+		plus colgen.rod_bound, so the bound of the result becomes the smaller
+		of that and its own. An "optimal" result is only kept as such when
+		that does not undercut it, and is "approximate" otherwise.
+		@return the result of the last model, which stays this structure's model'''
+		from colgen import _relaxation, rod_bound;
+		neighbours, radius = self.neighbours, self.radius;
+		while result.status == "infeasible" and self.is_pruned():
+			neighbours, radius = widen(neighbours, radius);
+			with phase(stats, "geometry"):
+				pairs = candidate_pairs(self._nodes, neighbours, radius);
+			self._build(pairs, stats=stats);
+			result = self._solve(stats, deadline, **options);
+		if not self.is_pruned() or result.x is None:
+			return result;
+		model = self.model();
+		with phase(stats, "pricing"):
+			relaxed, y = _relaxation(self);
+			if y is None:
+				return result;
+			least = rod_bound(self._nodes, y, np.abs(self._mass[:model.n]).sum(), model.ea, model.eb,
+							  model.bigm, model.m2);
+		if result.bound is not None:
+			result.bound = min(result.bound, relaxed.fun + least);
+		if result.status == "optimal" and result.fun - result.bound > 1e-6*max(abs(result.fun), 1.0):
+			result.status = "approximate";
+		return result;
+
+	async def solve_async(self, callback=None, **options):
+		'''Run solve in a worker thread, so that the event loop goes on.
+		callback(solution) is called in the event loop with the Solution
+		of every new incumbent, whose bound is the one at that moment.
+		time_limit, mip_gap and the other options are passed on to solve,
+		and cancelling the awaiting task stops the branch-and-bound.
+		@return the IntLinProgResult'''
+		loop = asyncio.get_running_loop();
+		stop = threading.Event();
+		def incumbent(x, fun, bound):
+			if callback is not None:
+				solution = self._decode_vector(x, "incumbent", fun, bound);
+				loop.call_soon_threadsafe(callback, solution);
+		try:
+			return await loop.run_in_executor(None, lambda: self.solve(callback=incumbent, stop=stop, **options));
+		except asyncio.CancelledError:
+			stop.set();
+			raise;
+
+	async def incumbents(self, **options):
+		'''Yield the Solution of every new incumbent of solve_async and at
+		last the final Solution. Closing the iterator early cancels the solve.'''
+		queue = asyncio.Queue();
+		task = asyncio.ensure_future(self.solve_async(queue.put_nowait, **options));
+		try:
+			while not task.done() or not queue.empty():
+				get = asyncio.ensure_future(queue.get());
+				await asyncio.wait({get, task}, return_when=asyncio.FIRST_COMPLETED);
+				if get.done():
+					yield get.result();
+				else:
+					get.cancel();
+			yield self.decode(task.result());
+		finally:
+			task.cancel();
+
+	def presolve(self, tol=1e-6, coincident="merge", check=True):
+		'''Merge, reject or fix coinciding balls and check the relaxation,
+		see presolve.py. @return a Presolved, whose solve() gives the
+		Solution of this structure'''
+		from presolve import presolve;
+		return presolve(self, tol, coincident, check);
+
+	def solve_approx(self, rounding="threshold", threshold=1e-6, trials=1, passes=3, seed=None, tol=1e-6):
+		'''Find a good mobile from a few LPs instead of branching.
+		With every rod available, LPs reweighted passes times concentrate the
+		load on few supports, which are then fixed. The rods of the LP for
+		these supports are rounded, relative to the largest one, at threshold,
+		or with "random" rounding each rod is taken with its relative value as
+		probability and the best of trials is kept. When the force LP of the
+		rounded rods is infeasible it is repaired by adding supports.
+		@return an IntLinProgResult of status "approximate" whose bound is
+		the LP relaxation of the model, so its gap is a worst case'''
+		start = time.perf_counter();
 		C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = self.build_intlinprog();
-		result = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i);
+		lb, ub = self.bounds();
+		lb[:i], ub[:i] = np.clip(lb[:i], 0.0, 1.0), np.clip(ub[:i], 0.0, 1.0);
+		model = self.model();
+		e, n = model.num_edges, model.n;
+		lps = [];
+		def lp(c, lo, hi):
+			result = intlinprog(c, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, 0, bounds=(lo, hi));
+			lps.extend(result.node_times);
+			return result;
+		def loaded(x):
+			return x[i+e:].reshape(n, 6).sum(axis=1) > tol;
+
+		relaxed = lp(C, lb, ub);
+		if relaxed.x is None:
+			relaxed.time = time.perf_counter() - start;
+			return relaxed;
+		lo, hi = lb.copy(), ub.copy();
+		lo[:e] = ub[:e];
+		c = C.copy();
+		result = lp(c, lo, hi);
+		for k in range(passes):
+			w = result.x[e:i];
+			c[e:i] = C[e:i] / (w + 1e-4*w.max());
+			result = lp(c, lo, hi);
+		supports = loaded(result.x);
+		lo, hi = lb.copy(), ub.copy();
+		lo[e:i] = hi[e:i] = supports;
+		value = lp(C, lo, hi).x[:e];
+		value = value / max(value.max(), tol);
+
+		# both directions of a rod are rounded alike
+		_, pair = np.unique(np.minimum(model.ea, model.eb)*n + np.maximum(model.ea, model.eb),
+							return_inverse=True);
+		rng = np.random.default_rng(seed);
+		best = None;
+		for trial in range(trials if rounding == "random" else 1):
+			if rounding == "random":
+				rods = rng.random(pair.max()+1)[pair] < value;
+			else:
+				rods = value > threshold;
+			lo[:e] = hi[:e] = rods;
+			lo[e:i] = hi[e:i] = supports;
+			result = lp(C, lo, hi);
+			if result.x is None:
+				lo[e:i], hi[e:i] = 0.0, 1.0;
+				result = lp(C, lo, hi);
+				if result.x is None:
+					continue;
+				lo[e:i] = hi[e:i] = loaded(result.x);
+				result = lp(C, lo, hi);
+			# rods without tension are left out
+			result.x[:e] *= result.x[i:i+e] > tol;
+			result.fun = float(C @ result.x);
+			if best is None or result.fun < best.fun:
+				best = result;
+		if best is None:
+			return IntLinProgResult(None, None, "infeasible", relaxed.fun, len(lps), lps,
+									time.perf_counter() - start);
+		return IntLinProgResult(best.x, best.fun, "approximate", relaxed.fun, len(lps), lps,
+								time.perf_counter() - start);
+
+	def solve_colgen(self, neighbours=2, batch=None, max_rounds=None, max_columns=None, **options):
+		'''Generate the rod candidates from the nearest neighbours by pricing
+		instead of offering all pairs, see colgen.py. @return the Solution'''
+		from colgen import solve_colgen;
+		return solve_colgen(self, neighbours, batch, max_rounds, max_columns, **options);
+
+	def solve_decomposed(self, threshold=None, workers=1, **options):
+		'''Solve the groups of balls further apart than threshold as separate
+		mobiles, see decompose.py. @return the merged Solution'''
+		from decompose import solve_clusters;
+		return solve_clusters(self, threshold, workers, **options);
+
+	def solve_multilevel(self, ratio=8, coarse_size=40, seed=0, **options):
+		'''Solve a coarsened mobile of clusters of about ratio balls and refine
+		it level by level with small MILPs, see multilevel.py.
+		@return the Solution, whose bound is a lower bound of any mobile'''
+		from multilevel import solve_multilevel;
+		return solve_multilevel(self, ratio, coarse_size, seed, **options);
+
+	def resolve(self, mass, **options):
+		'''Solve again after the masses have changed to mass.
+		The built model is kept and only its mass dependent entries are
+		updated, and the previous rods and supports are the MIP start.
+		A pruned model is checked against the missing rods as by solve.
+		The speedup of the result is the last cold solve time over this one.'''
+		if self._result is None:
+			self.mass = mass;
+			return self.solve(**options);
+		deadline = None if options.get("time_limit") is None else time.perf_counter() + options["time_limit"];
+		self._set_mass(mass);
+		C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = self.build_intlinprog();
+		result = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=self.bounds(),
+							x0=self._result.x, **options);
+		if self.is_pruned():
+			result = self._widen(result, None, deadline, **options);
+		result.speedup = self._cold_time / result.time if result.time > 0 else None;
+		self._result = result;
 		return result;
 
+	def sweep(self, masses, workers=1, **options):
+		'''Solve for every mass vector of masses with one model per chunk,
+		skipping branch-and-bound where the previous rods and supports are
+		certified optimal, see sweep.py. @return one record per point'''
+		from sweep import sweep;
+		return sweep(self, masses, workers, **options);
+
+	def add_node(self, point, mass, neighbourhood=8, **options):
+		'''Add a ball at point and solve again, see _resolve_near. With
+		explicit pairs the new ball is offered rods to its neighbourhood
+		nearest balls. @return the IntLinProgResult'''
+		previous = self._previous();
+		n = len(self._nodes);
+		point = np.asarray(point, dtype=float).reshape(3);
+		if self._pairs is not None:
+			d = self._nodes - point;
+			near = np.argsort((d*d).sum(axis=1))[:neighbourhood];
+			a, b = (np.asarray(v, dtype=np.int64) for v in self._pairs);
+			self._pairs = (np.r_[a, near], np.r_[b, np.full(len(near), n)]);
+		self._nodes = np.vstack([self._nodes, point]);
+		self._mass = np.r_[self._mass[:n], float(mass)];
+		if self._distances is not None:
+			d = point - self._nodes;
+			distance = np.sqrt((d*d).sum(axis=1));
+			unit = np.divide(d, distance[:, np.newaxis], out=np.zeros_like(d), where=distance[:, np.newaxis] > 0);
+			self._distances = np.pad(self._distances, ((0, 1), (0, 1)));
+			self._distances[n, :] = self._distances[:, n] = distance;
+			self._unit = np.pad(self._unit, ((0, 1), (0, 1), (0, 0)));
+			self._unit[n, :] = unit;
+			self._unit[:, n] = -unit;
+		self._model = None;
+		return self._resolve_near(point, previous, [], neighbourhood, **options);
+
+	def remove_node(self, k, **options):
+		'''Remove ball k, the balls after it move down by one, and solve
+		again, see _resolve_near. @return the IntLinProgResult'''
+		previous = self._previous();
+		n = len(self._nodes);
+		point = self._nodes[k].copy();
+		self._nodes = np.delete(self._nodes, k, axis=0);
+		self._mass = np.delete(self._mass[:n], k);
+		if self._distances is not None:
+			self._distances = np.delete(np.delete(self._distances, k, axis=0), k, axis=1);
+			self._unit = np.delete(np.delete(self._unit, k, axis=0), k, axis=1);
+		shift = np.r_[np.arange(k), -1, np.arange(k, n-1)];
+		if self.pairs is not None:
+			a, b = (shift[np.asarray(v)] for v in self.pairs);
+			self.pairs = (a[(a >= 0) & (b >= 0)], b[(a >= 0) & (b >= 0)]);
+		touched = [];
+		if previous is not None:
+			rods, supports = previous;
+			ends = rods[(rods == k).any(axis=1)].ravel();
+			touched = shift[ends[ends != k]];
+			rods = shift[rods];
+			previous = rods[(rods >= 0).all(axis=1)], shift[supports][shift[supports] >= 0];
+		self._model = None;
+		return self._resolve_near(point, previous, touched, **options);
 
+	def move_node(self, k, point, **options):
+		'''Move ball k to point and solve again, see _resolve_near.
+		@return the IntLinProgResult'''
+		previous = self._previous();
+		point = np.asarray(point, dtype=float).reshape(3);
+		self._nodes = self._nodes.copy();
+		self._nodes[k] = point;
+		if self._distances is not None:
+			d = point - self._nodes;
+			distance = np.sqrt((d*d).sum(axis=1));
+			unit = np.divide(d, distance[:, np.newaxis], out=np.zeros_like(d), where=distance[:, np.newaxis] > 0);
+			self._distances[k, :] = self._distances[:, k] = distance;
+			self._unit[k, :] = unit;
+			self._unit[:, k] = -unit;
+		self._model = None;
+		touched = [] if previous is None else previous[0][(previous[0] == k).any(axis=1)].ravel();
+		return self._resolve_near(point, previous, touched, **options);
+
+	def _previous(self):
+		'''@return the rods and supports of the last solution, or None'''
+		if self._result is None or self._result.x is None:
+			return None;
+		solution = self.decode(self._result);
+		return solution.rods, solution.supports;
+
+	def _resolve_near(self, point, previous, touched, neighbourhood=8, **options):
+		'''Solve after a change at point with the rods and supports away from
+		it kept: only the neighbourhood balls nearest to point, the touched
+		balls which had a rod to the changed ball, and the rods touching
+		these are free. Every other ball can keep its previous forces. The
+		start is the previous mobile with every free ball supported, which
+		is feasible whenever the supports are. The result has status "local"
+		when that solve succeeds, its bound only holds for the fixed part.
+		When it ends without a mobile, infeasible or at a limit before the
+		start was taken, or without a previous solution, the whole structure
+		is solved, with the same MIP start.'''
+		if previous is None:
+			return self.solve(**options);
+		rods, supports = previous;
+		model = self.model();
+		n, e = model.n, model.num_edges;
+		d = self._nodes - point;
+		near = np.zeros(n, dtype=bool);
+		near[np.argsort((d*d).sum(axis=1))[:neighbourhood]] = True;
+		near[np.asarray(touched, dtype=np.int64)] = True;
+		# the binaries come first, the x of every edge and then the x extern of every ball
+		free = np.r_[near[model.ea] | near[model.eb], near];
+		key = np.minimum(model.ea, model.eb)*n + np.maximum(model.ea, model.eb);
+		was = np.r_[np.isin(key, rods.min(axis=1)*n + rods.max(axis=1)),
+					np.isin(np.arange(n), supports)].astype(float);
+
+		C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = self.build_intlinprog();
+		lb, ub = self.bounds();
+		lb, ub = lb.copy(), ub.copy();
+		lb[:i] = np.where(free, lb[:i], was);
+		ub[:i] = np.where(free, ub[:i], was);
+		start = was.copy();
+		start[e:][near] = 1.0;
+		x0 = np.r_[start, np.zeros(len(C) - i)];
+		result = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=(lb, ub), x0=x0, **options);
+		if result.x is None:
+			result = self.solve(x0=x0, **options);
+		elif result.status == "optimal":
+			result.status = "local";
+		self._result = result;
+		return result;
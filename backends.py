@@ -0,0 +1,333 @@
+'''MILP solvers behind lpsolver.intlinprog.
+
+	intlinprog(..., backend="auto")
+
+"native" is the branch-and-bound of lpsolver.py, "scipy" the HiGHS MIP
+solver of scipy.optimize.milp and "cplex" the CPLEX callable library
+when it can be imported. "auto" picks one from the number of columns and
+binaries: with a calibration file, written by
+
+	python backends.py --calibrate
+
+the backend with the least predicted time, from a log-log fit of the
+recorded times against the columns and binaries; without one, the
+native solver for small models, which has no start-up cost, and
+otherwise the strongest engine available. The options callback, stop and x0 are only honoured
+by the native solver, so "auto" keeps it when they are given; another
+backend named explicitly raises a ValueError for callback and stop and
+warns that it ignores x0.
+'''
+from __future__ import print_function
+
+import abc
+import argparse
+import json
+import os
+import time
+import warnings
+
+import numpy as np
+from scipy import sparse
+
+from lpsolver import IntLinProgResult, _empty, _polish, _stack
+
+CALIBRATION = os.environ.get("HANGINGMOBILE_CALIBRATION",
+							 os.path.join(os.path.expanduser("~"), ".hangingmobile", "calibration.json"))
+
+# binaries and columns up to which the native solver is chosen without a calibration
+SMALL = 64
+SMALL_COLUMNS = 1024
+
+_NATIVE_ONLY = ("callback", "stop", "x0")
+
+
+class Backend(abc.ABC):
+	'''A MILP solver: min C x, A_ub x <= b_ub, A_lb x >= b_lb, A_eq x = b_eq,
+	x[0:i] binary, lb <= x <= ub.'''
+	name = None
+	strength = 0      # preference among the available backends for large models
+
+	def available(self):
+		return True
+
+	@abc.abstractmethod
+	def solve(self, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=None, time_limit=None,
+			  mip_gap=None, max_nodes=None, **options):
+		'''@return an IntLinProgResult'''
+
+
+class NativeBackend(Backend):
+	'''The branch-and-bound of lpsolver.intlinprog.'''
+	name = "native"
+
+	def solve(self, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=None, time_limit=None,
+			  mip_gap=None, max_nodes=None, **options):
+		from lpsolver import intlinprog
+		return intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds, time_limit=time_limit,
+						  mip_gap=mip_gap, max_nodes=max_nodes, **options)
+
+
+def _inequalities(A_ub, b_ub, A_lb, b_lb):
+	'''@return A, b of all the inequalities as A x <= b'''
+	return _stack(A_ub, b_ub, None if _empty(A_lb) else -A_lb,
+				  None if _empty(A_lb) else -np.asarray(b_lb, dtype=float))
+
+
+def _bounds(n, i, bounds):
+	lb = np.zeros(n) if bounds is None else np.array(bounds[0], dtype=float)
+	ub = np.full(n, np.inf) if bounds is None else np.array(bounds[1], dtype=float)
+	lb[:i], ub[:i] = np.clip(np.ceil(lb[:i] - 1e-9), 0.0, 1.0), np.clip(np.floor(ub[:i] + 1e-9), 0.0, 1.0)
+	return lb, np.where(ub >= 1.0e+20, np.inf, ub)
+
+
+def _polished(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, x):
+	'''@return x with its binaries rounded and the continuous part solved
+	again with them fixed, and its objective, or None when that LP is
+	infeasible. The engines take binaries within their tolerance as
+	integral, and under a big-M of 8888 a binary at 1e-7 still carries a
+	force.'''
+	from scipy.optimize import linprog
+	A, b = _inequalities(A_ub, b_ub, A_lb, b_lb)
+	lb, ub = _bounds(len(C), i, bounds)
+	return _polish(linprog, np.asarray(C, dtype=float), A, b, None if _empty(A_eq) else A_eq,
+				   None if _empty(A_eq) else b_eq, i, lb, ub, np.asarray(x, dtype=float))
+
+
+def _native(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, time_limit, mip_gap, max_nodes, start, x0):
+	'''@return the IntLinProgResult of the native solver in the time left
+	since start, for a model whose incumbent could not be polished at its
+	objective, starting from x0'''
+	from lpsolver import intlinprog
+	left = None if time_limit is None else max(0.0, time_limit - (time.perf_counter() - start))
+	result = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds, time_limit=left,
+						mip_gap=mip_gap, max_nodes=max_nodes, x0=x0)
+	result.time = time.perf_counter() - start
+	result.backend = "native"
+	return result
+
+
+class ScipyBackend(Backend):
+	'''scipy.optimize.milp, the HiGHS branch-and-cut.'''
+	name = "scipy"
+	strength = 1
+
+	def available(self):
+		try:
+			from scipy.optimize import milp
+		except ImportError:
+			return False
+		return True
+
+	def solve(self, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=None, time_limit=None,
+			  mip_gap=None, max_nodes=None, **options):
+		from scipy.optimize import Bounds, LinearConstraint, milp
+		start = time.perf_counter()
+		C = np.asarray(C, dtype=float)
+		n = len(C)
+		A, b = _inequalities(A_ub, b_ub, A_lb, b_lb)
+		constraints = []
+		if A is not None:
+			constraints.append(LinearConstraint(A, -np.inf, b))
+		if not _empty(A_eq):
+			constraints.append(LinearConstraint(A_eq, b_eq, b_eq))
+		lb, ub = _bounds(n, i, bounds)
+		limits = {"time_limit": time_limit, "mip_rel_gap": mip_gap, "node_limit": max_nodes}
+		res = milp(C, constraints=constraints, integrality=np.r_[np.ones(i), np.zeros(n-i)],
+				   bounds=Bounds(lb, ub), options={k: v for k, v in limits.items() if v is not None})
+		x = fun = None
+		if res.x is not None:
+			polished = _polished(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, res.x)
+			if polished is None or polished[1] > res.fun + 1e-6*max(abs(res.fun), 1.0):
+				return _native(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, time_limit, mip_gap, max_nodes,
+							   start, None if polished is None else polished[0])
+			x, fun = polished
+		if res.status == 0:
+			status = "optimal" if not mip_gap or (getattr(res, "mip_gap", 0.0) or 0.0) <= 1e-9 else "gap_limit"
+		elif res.status == 1:
+			status = "time_limit" if "time" in res.message.lower() else "node_limit"
+		else:
+			status = {2: "infeasible", 3: "unbounded"}.get(res.status, "infeasible")
+		bound = getattr(res, "mip_dual_bound", None)
+		return IntLinProgResult(x, None if x is None else float(fun), status,
+								-np.inf if bound is None else bound, getattr(res, "mip_node_count", 0) or 0,
+								[], time.perf_counter() - start)
+
+
+class CplexBackend(Backend):
+	'''The CPLEX callable library.'''
+	name = "cplex"
+	strength = 2
+
+	def available(self):
+		try:
+			import cplex
+		except ImportError:
+			return False
+		return True
+
+	def solve(self, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=None, time_limit=None,
+			  mip_gap=None, max_nodes=None, **options):
+		import cplex
+		start = time.perf_counter()
+		C = np.asarray(C, dtype=float)
+		n = len(C)
+		A, b = _inequalities(A_ub, b_ub, A_lb, b_lb)
+		blocks = [(M, v, "L") for M, v in [(A, b)] if M is not None]
+		if not _empty(A_eq):
+			blocks.append((A_eq, b_eq, "E"))
+		lb, ub = _bounds(n, i, bounds)
+
+		prob = cplex.Cplex()
+		prob.set_results_stream(None)
+		prob.set_log_stream(None)
+		prob.objective.set_sense(prob.objective.sense.minimize)
+		prob.variables.add(obj=C.tolist(), lb=lb.tolist(), ub=np.where(np.isinf(ub), cplex.infinity, ub).tolist(),
+						   types="B"*i + "C"*(n-i))
+		offset = 0
+		for M, v, sense in blocks:
+			M = sparse.coo_matrix(M)
+			prob.linear_constraints.add(rhs=np.asarray(v, dtype=float).tolist(), senses=sense*M.shape[0])
+			prob.linear_constraints.set_coefficients(zip((M.row + offset).tolist(), M.col.tolist(), M.data.tolist()))
+			offset += M.shape[0]
+		if time_limit is not None:
+			prob.parameters.timelimit.set(time_limit)
+		if mip_gap is not None:
+			prob.parameters.mip.tolerances.mipgap.set(mip_gap)
+		if max_nodes is not None:
+			prob.parameters.mip.limits.nodes.set(max_nodes)
+		prob.solve()
+
+		solution = prob.solution
+		code = solution.get_status()
+		codes = solution.status
+		if code in (codes.MIP_optimal, codes.optimal_tolerance):
+			status = "optimal" if code == codes.MIP_optimal or not mip_gap else "gap_limit"
+		elif code in (codes.MIP_time_limit_feasible, codes.MIP_time_limit_infeasible):
+			status = "time_limit"
+		elif code in (codes.MIP_node_limit_feasible, codes.MIP_node_limit_infeasible):
+			status = "node_limit"
+		elif code in (codes.MIP_unbounded, codes.MIP_infeasible_or_unbounded):
+			status = "unbounded"
+		else:
+			status = "infeasible"
+		x = fun = None
+		if solution.is_primal_feasible():
+			polished = _polished(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, solution.get_values())
+			fun = solution.get_objective_value()
+			if polished is None or polished[1] > fun + 1e-6*max(abs(fun), 1.0):
+				return _native(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds, time_limit, mip_gap, max_nodes,
+							   start, None if polished is None else polished[0])
+			x, fun = polished
+		return IntLinProgResult(x, fun, status, solution.MIP.get_best_objective(),
+								solution.progress.get_num_nodes_processed(), [], time.perf_counter() - start)
+
+
+BACKENDS = {backend.name: backend for backend in (NativeBackend(), ScipyBackend(), CplexBackend())}
+
+
+def available():
+	'''@return the names of the backends that can be used here'''
+	return [name for name, backend in BACKENDS.items() if backend.available()]
+
+
+def load_calibration(path=None):
+	'''@return the records of the calibration file, or an empty list'''
+	path = CALIBRATION if path is None else path
+	if not os.path.exists(path):
+		return []
+	with open(path) as f:
+		return json.load(f)
+
+
+def predict(records, name, columns, integers):
+	'''@return the predicted seconds of backend name for a model with that
+	many columns and binaries, from a least squares fit of log time against
+	the logs of both'''
+	points = [(r["columns"], r["integers"], r["time"]) for r in records
+			  if r["backend"] == name and r["status"] == "optimal"]
+	if not points:
+		return None
+	X = np.column_stack([np.ones(len(points)), np.log1p([p[0] for p in points]), np.log1p([p[1] for p in points])])
+	t = np.log([max(p[2], 1e-6) for p in points])
+	# centred, so that the minimum norm fit of a single size is its mean time
+	coef = np.linalg.lstsq(X - np.r_[0.0, X[:, 1:].mean(axis=0)], t, rcond=None)[0]
+	x = np.r_[1.0, np.log1p(columns), np.log1p(integers)] - np.r_[0.0, X[:, 1:].mean(axis=0)]
+	return float(np.exp(x @ coef))
+
+
+def select(columns, integers, records=None, names=None):
+	'''@return the name of the backend to use for a model of that size'''
+	names = available() if names is None else names
+	records = load_calibration() if records is None else records
+	predicted = {name: predict(records, name, columns, integers) for name in names}
+	predicted = {name: t for name, t in predicted.items() if t is not None}
+	if predicted:
+		return min(predicted, key=predicted.get)
+	if (integers <= SMALL and columns <= SMALL_COLUMNS) or len(names) == 1:
+		return "native"
+	return max(names, key=lambda name: BACKENDS[name].strength)
+
+
+def solve(backend, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, **options):
+	'''Solve with the named backend, "auto" selects one by select().
+	@return an IntLinProgResult'''
+	if backend == "auto":
+		if any(options.get(k) is not None for k in _NATIVE_ONLY):
+			backend = "native"
+		else:
+			backend = select(len(C), i)
+	if backend not in BACKENDS:
+		raise ValueError("backend must be one of auto, %s" % ", ".join(BACKENDS))
+	if not BACKENDS[backend].available():
+		raise ValueError("backend %s is not available" % backend)
+	if backend != "native":
+		given = [k for k in ("callback", "stop") if options.get(k) is not None]
+		if given:
+			raise ValueError("backend %s does not support %s" % (backend, " and ".join(given)))
+		if options.get("x0") is not None:
+			warnings.warn("backend %s ignores the start x0" % backend, RuntimeWarning, stacklevel=2)
+		options = {k: v for k, v in options.items() if k not in _NATIVE_ONLY + ("node_select", "tol")}
+	result = BACKENDS[backend].solve(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, **options)
+	if "backend" not in vars(result):
+		result.backend = backend
+	return result
+
+
+def calibrate(sizes=(4, 6, 8, 10), kinds=("random", "clustered"), seeds=(0,), time_limit=60.0,
+			  names=None, path=None):
+	'''Time every available backend on generated instances with bench.run
+	and write the records to the calibration file. @return the records'''
+	from bench import run
+	names = available() if names is None else names
+	records = []
+	for kind in kinds:
+		for n in sizes:
+			for seed in seeds:
+				for name in names:
+					r = run(kind, n, seed, time_limit=time_limit, backend=name, memory=False)
+					records.append({"backend": name, "kind": kind, "n": n, "seed": seed,
+									"columns": r["cols"], "integers": r["integers"], "status": r["status"],
+									"time": r["solve_time"]})
+	path = CALIBRATION if path is None else path
+	if os.path.dirname(path) and not os.path.isdir(os.path.dirname(path)):
+		os.makedirs(os.path.dirname(path))
+	with open(path, "w") as f:
+		json.dump(records, f, indent=1)
+	return records
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="MILP backends of the hanging mobile solver.")
+	parser.add_argument("--calibrate", action="store_true", help="time the backends and save the results")
+	parser.add_argument("--sizes", nargs="+", type=int, default=[4, 6, 8, 10])
+	parser.add_argument("--time-limit", type=float, default=60.0)
+	parser.add_argument("-o", "--output", default=None, help="calibration file, %s by default" % CALIBRATION)
+	args = parser.parse_args(argv)
+	if args.calibrate:
+		for r in calibrate(args.sizes, time_limit=args.time_limit, path=args.output):
+			print("%-7s %-10s n=%-3d %8.3fs %s" % (r["backend"], r["kind"], r["n"], r["time"], r["status"]))
+	print("available: %s" % ", ".join(available()))
+
+
+if __name__ == '__main__':
+	main()
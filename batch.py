@@ -0,0 +1,123 @@
+'''Solve many hanging mobiles across a pool of worker processes.
+
+	python batch.py instances.jsonl -o results.jsonl -j 8 --timeout 60
+
+Every line of a JSONL input is an instance {"id": ..., "nodes": [[x,y,z], ...],
+"mass": [...]}. An NPZ input holds the arrays nodes (m, n, 3), mass (m, n)
+and optionally ids (m,). The results are written as one JSON object per
+line in the order the solves complete; a solved record says whether its
+mobile passed verify.py.
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+
+import numpy as np
+
+from analysis import Structure
+from verify import verify
+
+
+def read_instances(path):
+	'''Yield (id, nodes, mass) of every instance in a JSONL or NPZ file.'''
+	if path.endswith(".npz"):
+		data = np.load(path)
+		ids = data["ids"].tolist() if "ids" in data else range(len(data["nodes"]))
+		for ident, nodes, mass in zip(ids, data["nodes"], data["mass"]):
+			yield ident, nodes.tolist(), mass.tolist()
+		return
+	with open(path) as f:
+		for line_no, line in enumerate(f):
+			if not line.strip():
+				continue
+			try:
+				instance = json.loads(line)
+				yield instance.get("id", line_no), instance["nodes"], instance["mass"]
+			except (ValueError, KeyError, AttributeError) as exc:
+				# handed to the pool as is, so that it is reported like any other failure
+				yield line_no, exc, None
+
+
+def solve_instance(job):
+	'''Solve one instance, never raising.
+	@return a JSON serialisable record of the result'''
+	ident, nodes, mass, options = job
+	start = time.perf_counter()
+	try:
+		if isinstance(nodes, Exception):
+			raise nodes
+		struct = Structure(nodes, mass, compact=options.get("compact", False),
+						   neighbours=options.get("neighbours"))
+		if len(struct.mass) != len(struct.nodes):
+			raise ValueError("%d nodes but %d masses" % (len(struct.nodes), len(struct.mass)))
+		result = struct.solve(time_limit=options.get("timeout"))
+		solution = struct.decode(result)
+		record = {"id": ident, "nodes": result.nodes}
+		record.update(solution.as_dict())
+		if solution.objective is not None:
+			record["verified"] = verify(struct, solution).passed
+	except Exception as exc:
+		record = {"id": ident, "status": "error", "error": "%s: %s" % (type(exc).__name__, exc)}
+	record["time"] = time.perf_counter() - start
+	return record
+
+
+def _solve_alone(job):
+	'''Solve one job in a pool of its own, to tell whether it kills its worker.'''
+	with ProcessPoolExecutor(1) as pool:
+		try:
+			return pool.submit(solve_instance, job).result()
+		except BrokenProcessPool:
+			return {"id": job[0], "status": "error", "error": "worker process died"}
+
+
+def run_batch(instances, workers=None, **options):
+	'''Solve the (id, nodes, mass) instances in a process pool.
+	When a worker dies every unfinished job is retried in a fresh pool, and
+	jobs caught in two broken pools are then solved one by one in isolation.
+	Yield one record per instance as soon as it is solved.'''
+	pending = dict(enumerate((ident, nodes, mass, options) for ident, nodes, mass in instances))
+	broken = dict.fromkeys(pending, 0)
+	while pending:
+		for key in [key for key in pending if broken[key] >= 2]:
+			yield _solve_alone(pending.pop(key))
+		with ProcessPoolExecutor(workers) as pool:
+			futures = {pool.submit(solve_instance, job): key for key, job in pending.items()}
+			try:
+				for future in as_completed(futures):
+					record = future.result()
+					del pending[futures[future]]
+					yield record
+			except BrokenProcessPool:
+				for key in pending:
+					broken[key] += 1
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Solve a batch of hanging mobiles.")
+	parser.add_argument("input", help="JSONL or NPZ file of instances")
+	parser.add_argument("-o", "--output", help="JSONL file of results, stdout by default")
+	parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes")
+	parser.add_argument("--timeout", type=float, default=None, help="seconds per instance")
+	parser.add_argument("--compact", action="store_true", help="use the compact formulation")
+	parser.add_argument("--neighbours", type=int, default=None, help="rod candidates per ball")
+	args = parser.parse_args(argv)
+
+	out = open(args.output, "w") if args.output else sys.stdout
+	try:
+		for record in run_batch(read_instances(args.input), args.workers, timeout=args.timeout,
+								compact=args.compact, neighbours=args.neighbours):
+			out.write(json.dumps(record) + "\n")
+			out.flush()
+	finally:
+		if out is not sys.stdout:
+			out.close()
+
+
+if __name__ == '__main__':
+	main()
@@ -0,0 +1,175 @@
+'''Reproducible benchmarks of model construction and solving.
+
+	python bench.py --kinds random grid --sizes 4 8 16 1000 -o bench.jsonl
+
+Every instance is generated from its kind, size and seed. One JSON line
+per instance records the build time, solve time, branch-and-bound nodes,
+peak memory of the build and the solve, the optimality gap and the model
+size, together with the formulation options, the MILP backend that
+solved it (--backend, see backends.py) and the git commit, so that runs
+of different formulations, solvers and commits can be compared.
+
+	python bench.py --startup -o bench.jsonl
+
+times the import of the entry modules in fresh interpreters instead, and
+records whether an import pulled in a solver library, since short lived
+worker processes pay it on every start.
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from analysis import Structure
+
+KINDS = ("random", "grid", "line", "clustered")
+
+# modules imported by the command line tools and worker processes
+STARTUP = ("analysis", "batch", "verify", "solution", "lpsolver")
+HEAVY = ("scipy", "cplex")
+
+
+def instance(kind, n, seed=0):
+	'''@return nodes (n, 3) and mass (n,) of a generated instance:
+	random: uniform in the unit cube
+	grid: a vertical square lattice in the x-z plane
+	line: evenly spaced on a slanted line
+	clustered: gaussian clusters of about 8 balls around uniform centres
+	'''
+	rng = np.random.default_rng(seed)
+	if kind == "random":
+		nodes = rng.random((n, 3))
+	elif kind == "grid":
+		side = int(np.ceil(np.sqrt(n)))
+		i = np.arange(n)
+		nodes = np.column_stack([i % side, np.zeros(n), -(i // side)]) / float(side)
+	elif kind == "line":
+		t = np.linspace(0.0, 1.0, n)
+		nodes = np.column_stack([t, 0.5*t, -t])
+	elif kind == "clustered":
+		centres = rng.random((max(1, n // 8), 3))
+		nodes = centres[rng.integers(len(centres), size=n)] + 0.02*rng.standard_normal((n, 3))
+	else:
+		raise ValueError("kind must be one of %s" % ", ".join(KINDS))
+	return nodes, rng.uniform(0.5, 1.5, n)
+
+
+def _peak(f):
+	'''@return the result of f() and the peak memory it traced in bytes'''
+	tracemalloc.start()
+	try:
+		result = f()
+		return result, tracemalloc.get_traced_memory()[1]
+	finally:
+		tracemalloc.stop()
+
+
+def run(kind, n, seed=0, solve=True, time_limit=None, backend="native", memory=True, **options):
+	'''Benchmark one instance, options are passed on to Structure and
+	backend to intlinprog, see backends.py. memory traces the peak memory
+	of a second build and solve.
+	@return a record of the measurements'''
+	nodes, mass = instance(kind, n, seed)
+	record = {"kind": kind, "n": n, "seed": seed}
+	record.update(options)
+
+	struct = Structure(nodes, mass, **options)
+	start = time.perf_counter()
+	ilp = struct.build_intlinprog()
+	record["build_time"] = time.perf_counter() - start
+	model = struct.model()
+	record.update(rows=model.num_rows, cols=model.num_cols, nnz=model.nnz, integers=ilp[-1])
+	del ilp
+	# the memory is measured on a second build, tracing slows it down
+	if memory:
+		_, record["build_peak"] = _peak(Structure(nodes, mass, **options).build_intlinprog)
+
+	if solve:
+		start = time.perf_counter()
+		result = struct.solve(stats=True, time_limit=time_limit, backend=backend)
+		record["solve_time"] = time.perf_counter() - start
+		# the backend that solved it, "auto" names the one it selected
+		record.update(backend=getattr(result, "backend", backend), status=result.status,
+					  objective=result.fun, nodes=result.nodes,
+					  time_per_node=result.time_per_node, incumbents=len(result.history),
+					  phases={name: t[0] for name, t in result.stats.phases.items()})
+		if result.fun is not None and np.isfinite(result.bound):
+			record["gap"] = (result.fun - result.bound) / max(abs(result.fun), 1e-12)
+		if memory:
+			_, record["solve_peak"] = _peak(lambda: Structure(nodes, mass, **options).solve(
+				time_limit=time_limit, backend=backend))
+	return record
+
+
+def startup(module, repeats=5):
+	'''Import module in repeats fresh interpreters.
+	@return a record of the fastest and the median import time'''
+	code = ("import sys, time\n"
+			"start = time.perf_counter()\n"
+			"import %s\n"
+			"print(time.perf_counter() - start, *[name for name in %r if name in sys.modules])" % (module, HEAVY))
+	times, heavy = [], []
+	for _ in range(repeats):
+		out = subprocess.check_output([sys.executable, "-c", code]).decode().split()
+		times.append(float(out[0]))
+		heavy = out[1:]
+	return {"kind": "startup", "module": module, "repeats": repeats, "import_time": float(np.median(times)),
+			"import_time_min": min(times), "heavy": heavy}
+
+
+def git_commit():
+	try:
+		return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"],
+									   stderr=subprocess.DEVNULL).decode().strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Benchmark the hanging mobile model.")
+	parser.add_argument("--kinds", nargs="+", default=list(KINDS), choices=KINDS)
+	parser.add_argument("--sizes", nargs="+", type=int, default=[4, 6, 8, 16, 64, 256, 1000])
+	parser.add_argument("--seeds", nargs="+", type=int, default=[0])
+	parser.add_argument("--solve-max", type=int, default=8,
+						help="only build the model above this many balls")
+	parser.add_argument("--time-limit", type=float, default=60.0, help="seconds per solve")
+	parser.add_argument("--compact", action="store_true")
+	parser.add_argument("--neighbours", type=int, default=None)
+	parser.add_argument("--bigm", default="constant", choices=("constant", "scaled"))
+	parser.add_argument("--backend", default="native", help="MILP solver, see backends.py, or auto")
+	parser.add_argument("--startup", action="store_true", help="time the imports of the entry modules")
+	parser.add_argument("-o", "--output", help="JSONL file to append to, stdout by default")
+	args = parser.parse_args(argv)
+
+	commit = git_commit()
+	out = open(args.output, "a") if args.output else sys.stdout
+	try:
+		if args.startup:
+			for module in STARTUP:
+				record = startup(module)
+				record["commit"] = commit
+				out.write(json.dumps(record) + "\n")
+				out.flush()
+			return
+		for kind in args.kinds:
+			for n in args.sizes:
+				for seed in args.seeds:
+					record = run(kind, n, seed, solve=n <= args.solve_max, time_limit=args.time_limit,
+								 backend=args.backend, compact=args.compact, neighbours=args.neighbours,
+								 bigm=args.bigm)
+					record["commit"] = commit
+					out.write(json.dumps(record) + "\n")
+					out.flush()
+	finally:
+		if out is not sys.stdout:
+			out.close()
+
+
+if __name__ == '__main__':
+	main()
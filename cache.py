@@ -0,0 +1,102 @@
+'''A cache of solved mobiles keyed on the geometry of the instance.
+
+Two instances share a key when their balls agree, within tol, after
+moving the centroid to the origin and sorting the balls, so translated
+or renumbered copies of a solved mobile are not solved again. Only
+translations are factored out: gravity fixes the orientation.
+'''
+import hashlib
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+from solution import Solution
+
+
+class SolveCache:
+	'''A bounded LRU of Solutions in memory, optionally backed by a
+	directory of Solution.save NPZ files that survives restarts.'''
+	def __init__(self, maxsize=1024, path=None, tol=1e-6, mass_tol=1e-6):
+		self.maxsize = maxsize
+		self.path = path
+		self.tol = tol
+		self.mass_tol = mass_tol
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+		self._memory = OrderedDict()
+		if path is not None and not os.path.isdir(path):
+			os.makedirs(path)
+
+	def canonical(self, struct):
+		'''@return the key of struct and perm, where canonical ball c is ball perm[c]'''
+		p = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+		q = np.round((p - p.mean(axis=0)) / self.tol).astype(np.int64)
+		m = np.round(np.asarray(struct.mass, dtype=float)[:len(p)] / self.mass_tol).astype(np.int64)
+		perm = np.lexsort((m, q[:, 2], q[:, 1], q[:, 0]))
+		h = hashlib.sha1(repr((struct.compact, struct.bigm, struct.neighbours, struct.radius)).encode())
+		h.update(q[perm].tobytes())
+		h.update(m[perm].tobytes())
+		if struct.pairs is not None:
+			inverse = np.empty_like(perm)
+			inverse[perm] = np.arange(len(perm))
+			pairs = np.sort(inverse[np.column_stack(struct.pairs)], axis=1)
+			h.update(np.unique(pairs, axis=0).astype(np.int64).tobytes())
+		return h.hexdigest(), perm
+
+	def _file(self, key):
+		return os.path.join(self.path, key + ".npz")
+
+	def get(self, struct):
+		'''@return the cached Solution of struct in its own numbering, or None'''
+		key, perm = self.canonical(struct)
+		solution = self._lookup(key)
+		if solution is None:
+			self.misses += 1
+			return None
+		self.hits += 1
+		return solution.renumber(perm)
+
+	def _lookup(self, key):
+		if key in self._memory:
+			self._memory.move_to_end(key)
+			return self._memory[key]
+		if self.path is not None and os.path.exists(self._file(key)):
+			solution = Solution.load(self._file(key))
+			self._remember(key, solution)
+			return solution
+		return None
+
+	def _remember(self, key, solution):
+		self._memory[key] = solution
+		self._memory.move_to_end(key)
+		while len(self._memory) > self.maxsize:
+			self._memory.popitem(last=False)
+			self.evictions += 1
+
+	def put(self, struct, solution):
+		'''Store the Solution of struct.'''
+		key, perm = self.canonical(struct)
+		inverse = np.empty_like(perm)
+		inverse[perm] = np.arange(len(perm))
+		solution = solution.renumber(inverse)
+		self._remember(key, solution)
+		if self.path is not None:
+			# Solution.save picks the format from the suffix
+			tmp = os.path.join(self.path, "%s.%d.tmp.npz" % (key, os.getpid()))
+			solution.save(tmp)
+			os.replace(tmp, self._file(key))
+
+	def solve(self, struct, **options):
+		'''@return the Solution of struct, solving it only on a cache miss'''
+		solution = self.get(struct)
+		if solution is None:
+			solution = struct.decode(struct.solve(**options))
+			if solution.status == "optimal":
+				self.put(struct, solution)
+		return solution
+
+	def stats(self):
+		return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+				"size": len(self._memory)}
@@ -0,0 +1,38 @@
+'''Rod candidate generation over a KD-tree of the ball coordinates.
+
+Instead of offering a rod between every pair of balls, only the pairs
+joining a ball to one of its k nearest neighbours, or lying within a
+given radius of each other, are kept.
+'''
+import numpy as np
+
+
+def candidate_pairs(points, neighbours=None, radius=None):
+	'''@return a, b arrays of the candidate pairs a < b, sorted'''
+	from scipy.spatial import cKDTree
+	points = np.asarray(points, dtype=float).reshape(-1, 3)
+	n = len(points)
+	tree = cKDTree(points)
+	found = [np.empty((0, 2), dtype=np.int64)]
+
+	if neighbours is not None and n > 1:
+		k = min(neighbours, n-1)
+		_, idx = tree.query(points, k=k+1)
+		idx = idx.reshape(n, k+1)
+		found.append(np.column_stack([np.repeat(np.arange(n), k+1), idx.ravel()]))
+
+	if radius is not None:
+		found.append(tree.query_pairs(radius, output_type="ndarray"))
+
+	pairs = np.concatenate(found).astype(np.int64)
+	pairs = np.sort(pairs, axis=1)
+	pairs = pairs[pairs[:, 0] != pairs[:, 1]]
+	pairs = np.unique(pairs, axis=0)
+	return pairs[:, 0], pairs[:, 1]
+
+
+def widen(neighbours=None, radius=None):
+	'''@return the doubled (neighbours, radius) to retry with after the
+	reduced model has failed'''
+	return (None if neighbours is None else 2*neighbours,
+			None if radius is None else 2.0*radius)
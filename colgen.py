@@ -0,0 +1,215 @@
+'''Column generation over the rod candidates of the compact model.
+
+The restricted master offers rods only to the nearest neighbours of every
+ball, next to the external supports of all balls. Its LP relaxation is
+solved, and the rods missing from it are priced with the duals of the
+equilibrium rows: taking a rod a < b at tension t costs t * 2L/M and
+moves t * unit(a, b) . (y_b - y_a) of the equilibrium, so it improves
+the relaxation when
+
+	2L/M - unit(a, b) . (y_b - y_a) < 0
+
+with M the big-M of the rod. The pairs are priced a chunk of balls at a
+time, so the n*n model is never built. Once no rod improves, the LP
+bound of the master is that of the whole model; the integer phase then
+branches over the generated rods only. The master is capped at
+max_columns rods, as with big-Ms as large as m2 nearly every rod prices
+in; once the pricing stops, the room left is filled with the missing
+rods of least reduced cost, see fill. Its mobile is optimal for the whole model when no missing rod taken
+at x = 1 could undercut it, see rod_bound.
+'''
+import numpy as np
+from scipy.optimize import linprog
+
+from candidates import candidate_pairs
+from model import _rod_weight
+
+
+def support_bigm(p, g, m2=8888, chunk=256):
+	'''@return the scaled big-M of every external support with all pairs
+	as rod candidates, see model.scaled_bigm, in O(chunk*n) memory'''
+	n = len(p)
+	g = np.abs(g)
+	G = g.sum()
+	m_ext = g.copy()
+	for start in range(0, n, chunk):
+		a = np.arange(start, min(start+chunk, n))
+		d = p[a, np.newaxis, :] - p[np.newaxis, :, :]
+		length = np.sqrt((d*d).sum(axis=2))
+		with np.errstate(divide="ignore", invalid="ignore"):
+			unit = np.nan_to_num(d / length[:, :, np.newaxis])
+		pull = G * _rod_weight(unit[:, :, 2]) * np.abs(unit).sum(axis=2)
+		pull[a - start, a] = 0.0
+		m_ext[a] += pull.sum(axis=1)
+	return np.fmax(float(m2), m_ext)
+
+
+def _costs(p, y, G, a, bigm, m2):
+	'''@return the length, big-M and reduced cost per unit of tension of
+	the rods from the balls a to every ball, (len(a), n) each'''
+	d = p[a, np.newaxis, :] - p[np.newaxis, :, :]
+	length = np.sqrt((d*d).sum(axis=2))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		unit = np.nan_to_num(d / length[:, :, np.newaxis])
+	if bigm == "constant":
+		m_rod = np.full(length.shape, float(m2))
+	else:
+		m_rod = np.fmax(float(m2), G * _rod_weight(unit[:, :, 2]))
+	cost = 2.0*length/m_rod - np.einsum("abk,abk->ab", unit, y[np.newaxis, :, :] - y[a, np.newaxis, :])
+	return length, m_rod, cost
+
+
+def price(p, y, G, bigm="constant", m2=8888, chunk=256, tol=1e-9):
+	'''@return a, b, reduced cost of the pairs a < b that improve the
+	relaxation for the equilibrium duals y (n, 3)'''
+	n = len(p)
+	found = [(np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64), np.empty(0))]
+	for start in range(0, n, chunk):
+		a = np.arange(start, min(start+chunk, n))
+		_, _, cost = _costs(p, y, G, a, bigm, m2)
+		ia, ib = np.nonzero((np.arange(n)[np.newaxis, :] > a[:, np.newaxis]) & (cost < -tol))
+		found.append((a[ia], ib, cost[ia, ib]))
+	return tuple(np.concatenate(v) for v in zip(*found))
+
+
+def rod_bound(p, y, G, ea, eb, bigm="constant", m2=8888, chunk=256):
+	'''@return the least that taking rods which are not among the edges
+	(ea, eb) adds to the LP bound, for the equilibrium duals y (n, 3) of an
+	LP optimum. The reduced cost of such a rod taken at x = 1 is
+	2L - M max(0, unit . (y_b - y_a)), with the dual of its f(i)-x(i) row
+	chosen as max(0, unit . (y_b - y_a)). When none is negative an integer
+	mobile with any of these rods is at least the LP bound plus the least
+	of them, otherwise plus the sum of the negative ones; inf without such
+	rods.'''
+	n = len(p)
+	have = np.unique(np.minimum(ea, eb)*n + np.maximum(ea, eb))
+	least, negative = np.inf, 0.0
+	for start in range(0, n, chunk):
+		a = np.arange(start, min(start+chunk, n))
+		length, m_rod, cost = _costs(p, y, G, a, bigm, m2)
+		reduced = np.fmin(2.0*length, m_rod*cost)
+		missing = (np.arange(n)[np.newaxis, :] > a[:, np.newaxis]) & \
+			~np.isin(a[:, np.newaxis]*n + np.arange(n)[np.newaxis, :], have)
+		least = min(least, float(reduced[missing].min(initial=np.inf)))
+		negative += float(np.fmin(reduced[missing], 0.0).sum())
+	return least if least >= 0 else negative
+
+
+def fill(p, y, G, ea, eb, room, bigm="constant", m2=8888, chunk=256):
+	'''@return a, b of the at most room pairs a < b that are not among the
+	edges (ea, eb) with the least reduced cost at x = 1, see rod_bound:
+	those are the rods most able to undercut a mobile of the master'''
+	n = len(p)
+	have = np.unique(np.minimum(ea, eb)*n + np.maximum(ea, eb))
+	keys, costs = np.empty(0, dtype=np.int64), np.empty(0)
+	for start in range(0, n, chunk):
+		if room <= 0:
+			break
+		a = np.arange(start, min(start+chunk, n))
+		length, m_rod, cost = _costs(p, y, G, a, bigm, m2)
+		reduced = np.fmin(2.0*length, m_rod*cost)
+		key = a[:, np.newaxis]*n + np.arange(n)[np.newaxis, :]
+		missing = (np.arange(n)[np.newaxis, :] > a[:, np.newaxis]) & ~np.isin(key, have)
+		keys, costs = np.r_[keys, key[missing]], np.r_[costs, reduced[missing]]
+		best = np.argsort(costs, kind="stable")[:room]
+		keys, costs = keys[best], costs[best]
+	return np.divmod(keys, n)
+
+
+def _relaxation(master):
+	'''@return the scipy result of the LP relaxation of master, and its
+	equilibrium duals (n, 3)'''
+	C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = master.build_intlinprog()
+	lb, ub = master.bounds()
+	lb, ub = lb.copy(), ub.copy()
+	lb[:i], ub[:i] = np.clip(lb[:i], 0.0, 1.0), np.clip(ub[:i], 0.0, 1.0)
+	# the model has no >= rows, A_lb is empty
+	res = linprog(C, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+				  bounds=np.column_stack([lb, ub]), method="highs")
+	if res.status != 0:
+		return res, None
+	n = master.model().n
+	return res, res.eqlin.marginals[:3*n].reshape(n, 3)
+
+
+def column_generation(struct, neighbours=2, batch=None, max_rounds=None, max_columns=None, tol=1e-9,
+					  chunk=256):
+	'''Generate the rods of the compact LP relaxation of struct.
+	batch limits the rods priced in per round, the most improving first,
+	by default to the number of balls, and max_columns the rods of the
+	master, by default to 8 per ball: with big-Ms as large as m2 almost
+	every rod improves the relaxation a little, and pricing would bring
+	most pairs back.
+	@return the final restricted master, a Structure with explicit pairs,
+	its LP bound (None unless proven for the whole model) and the rounds'''
+	p = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+	g = np.asarray(struct.mass, dtype=float)[:len(p)]
+	n = len(p)
+	bigm = "constant" if struct.bigm == "constant" else "scaled"
+	m_ext = None if bigm == "constant" else support_bigm(p, g, chunk=chunk)
+	batch = n if batch is None else batch
+	max_columns = 8*n if max_columns is None else max_columns
+	a, b = candidate_pairs(p, neighbours)
+	rounds, bound = 0, None
+	while True:
+		master = _master(struct, p, g, bigm, m_ext, a, b)
+		res, y = _relaxation(master)
+		if y is None:
+			return master, None, rounds
+		rounds += 1
+		na, nb, cost = price(p, y, np.abs(g).sum(), bigm, chunk=chunk, tol=tol)
+		new = ~np.isin(na*n + nb, a*n + b)
+		na, nb, cost = na[new], nb[new], cost[new]
+		if len(na) == 0:
+			bound = res.fun
+			break
+		if (max_rounds is not None and rounds >= max_rounds) or len(a) >= max_columns:
+			break
+		best = np.argsort(cost)[:min(batch, max_columns - len(a))]
+		keys = np.unique(np.r_[a*n + b, na[best]*n + nb[best]])
+		a, b = np.divmod(keys, n)
+	# the LP no longer asks for rods, but a mobile may need some of those
+	# it prices at about zero: fill the room left with them
+	fa, fb = fill(p, y, np.abs(g).sum(), a, b, max_columns - len(a), bigm, chunk=chunk)
+	if len(fa) == 0:
+		return master, bound, rounds
+	keys = np.unique(np.r_[a*n + b, fa*n + fb])
+	return _master(struct, p, g, bigm, m_ext, *np.divmod(keys, n)), bound, rounds
+
+
+def _master(struct, p, g, bigm, m_ext, a, b):
+	'''@return the restricted master over the pairs (a, b)'''
+	master = type(struct)(p, g, compact=True, bigm=bigm, pairs=(a, b))
+	if m_ext is not None:
+		master.model().set_support_bigm(m_ext)
+	return master
+
+
+def solve_colgen(struct, neighbours=2, batch=None, max_rounds=None, max_columns=None, **options):
+	'''Column generation followed by branch-and-bound over the generated
+	rods, options are passed on to Structure.solve.
+	@return the Solution. Its bound is the smaller of the bound of the
+	master and the LP bound of the master plus rod_bound of the missing
+	rods, which holds for the whole model whether or not the pricing ran
+	to the end. It is "optimal" only when the mobile attains that bound,
+	otherwise "approximate" with the gap to it as the worst case. Pricing
+	with the duals of the LP with the binaries fixed at the mobile would
+	prove nothing: a missing rod may save a support, which that LP cannot
+	see. With big-Ms as large as m2 the relaxation is weak, so most
+	mobiles of several balls stay "approximate".'''
+	master, _, rounds = column_generation(struct, neighbours, batch, max_rounds, max_columns)
+	result = master.solve(**options)
+	solution = master.decode(result)
+	bound = None
+	if result.bound is not None and result.x is not None:
+		relaxed, y = _relaxation(master)
+		if y is not None:
+			model = master.model()
+			p = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+			G = np.abs(np.asarray(struct.mass, dtype=float)[:len(p)]).sum()
+			bound = min(result.bound, relaxed.fun + rod_bound(p, y, G, model.ea, model.eb, model.bigm, model.m2))
+	solution.bound = bound
+	if solution.status == "optimal" and (bound is None or
+										 solution.objective - bound > 1e-6*max(abs(bound), 1.0)):
+		solution.status = "approximate"
+	return solution
@@ -0,0 +1,114 @@
+'''Solve spatially separated groups of balls as independent mobiles.
+
+The balls are grouped by single linkage: two balls are in the same group
+when a chain of balls joins them with no step longer than the threshold.
+Every group is solved as a Structure of its own, in a process pool, and
+the solutions are merged, so the solve time grows with the largest group
+rather than with the number of balls.
+
+The merged mobile is feasible for the whole model, since it only leaves
+out the rods between groups. Its objective is recomputed with the
+support weight of the whole instance; the weight of a support exceeds
+the length of all rods together in both models, so each group is solved
+for the same trade-off. It is not proven optimal: a long rod between two
+groups may still save a support, which is why the groups should be far
+apart compared with the distances within them.
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from model import _len_sum
+from solution import Solution
+
+# the statuses of lpsolver.IntLinProgResult from the most to the least severe
+_SEVERITY = {status: rank for rank, status in enumerate(
+	("infeasible", "unbounded", "cancelled", "time_limit", "node_limit", "gap_limit", "local",
+	 "approximate", "optimal"))}
+
+
+def worst_status(statuses):
+	'''@return the most severe of statuses, any unknown status before all others'''
+	return min(statuses, key=lambda status: _SEVERITY.get(status, -1))
+
+
+def default_threshold(points, factor=2.0):
+	'''@return factor times the largest distance from a ball to its nearest
+	neighbour, so that no ball is left on its own'''
+	if len(points) < 2:
+		return 0.0
+	d, _ = cKDTree(points).query(points, k=2)
+	return factor * float(d[:, 1].max())
+
+
+def clusters(points, threshold=None):
+	'''@return the number of groups and the group label of every ball'''
+	points = np.asarray(points, dtype=float).reshape(-1, 3)
+	n = len(points)
+	if threshold is None:
+		threshold = default_threshold(points)
+	pairs = cKDTree(points).query_pairs(threshold, output_type="ndarray")
+	graph = coo_matrix((np.ones(len(pairs)), (pairs[:, 0], pairs[:, 1])), shape=(n, n))
+	return connected_components(graph, directed=False)
+
+
+def _restrict(pairs, idx, n):
+	'''@return the pairs within the balls idx, numbered as in idx, or None'''
+	if pairs is None:
+		return None
+	local = np.full(n, -1)
+	local[idx] = np.arange(len(idx))
+	a, b = (local[np.asarray(v)] for v in pairs)
+	keep = (a >= 0) & (b >= 0)
+	return a[keep], b[keep]
+
+
+def _solve_group(job):
+	cls, nodes, mass, kwargs, options = job
+	struct = cls(nodes, mass, **kwargs)
+	return struct.decode(struct.solve(**options))
+
+
+def solve_clusters(struct, threshold=None, workers=1, **options):
+	'''Solve every group of struct on its own, options are passed on to
+	Structure.solve, and workers > 1 solves the groups in parallel.
+	@return the merged Solution in the numbering of struct, without a bound,
+	whose status is the worst of the groups, "approximate" when they are all
+	optimal'''
+	points = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+	mass = np.asarray(struct.mass, dtype=float)[:len(points)]
+	count, labels = clusters(points, threshold)
+	members = [np.nonzero(labels == c)[0] for c in range(count)]
+	# the largest groups first, so they do not end up last in the pool
+	members.sort(key=len, reverse=True)
+	kwargs = {"compact": struct.compact, "neighbours": struct.neighbours,
+			  "radius": struct.radius, "bigm": struct.bigm}
+	jobs = [(type(struct), points[idx], mass[idx], dict(kwargs, pairs=_restrict(struct.pairs, idx, len(points))),
+			 options) for idx in members]
+	if workers == 1 or count == 1:
+		parts = [_solve_group(job) for job in jobs]
+	else:
+		with ProcessPoolExecutor(workers) as pool:
+			parts = list(pool.map(_solve_group, jobs))
+
+	status = worst_status(part.status for part in parts)
+	if status == "optimal" and count > 1:
+		# every group is optimal, the merged mobile is not proven so
+		status = "approximate"
+	if any(part.objective is None for part in parts):
+		return Solution(status, None, None, np.empty((0, 2), dtype=np.int64), np.empty(0),
+						np.empty(0, dtype=np.int64), np.empty((0, 6)))
+	rods = np.concatenate([idx[part.rods].reshape(-1, 2) for idx, part in zip(members, parts)])
+	supports = np.concatenate([idx[part.supports] for idx, part in zip(members, parts)])
+	length = np.sqrt(((points[rods[:, 0]] - points[rods[:, 1]])**2).sum(axis=1))
+	# the objective of revision2 weighs every rod twice, see model.build_model
+	rod_cost = float(2.0*length.sum())
+	support_cost = float((_len_sum(points) + 1.0)*len(supports))
+	merged = Solution(status, rod_cost + support_cost, None, rods,
+					  np.concatenate([part.tension for part in parts]), supports,
+					  np.concatenate([part.support_force for part in parts]).reshape(-1, 6),
+					  rod_cost, support_cost)
+	return merged.renumber(np.arange(len(points)))
@@ -0,0 +1,206 @@
+'''Streaming LP and free-MPS writers for the MILP of a Structure.
+
+The files are written from the Model of the structure, struct.model():
+its COO triplets, objective, bounds, types, senses and right-hand sides.
+The triplets are walked in row order for LP and in column order for MPS
+through one argsort of their indices, in chunks of at most chunk rows or
+columns and triplets, and the names and lines of one chunk are the only
+strings held at once. Paths ending in .gz, .bz2 or .xz are compressed, at a low level
+which keeps the writing fast.
+
+	write_lp(struct, "mobile.lp.gz")
+	write_mps(struct, "mobile.mps")
+
+Columns and rows keep the names of Model.colname and Model.rowname, with
+x(a,b) written as x_a_b and r(k) as r_k, which both formats accept. The
+-0.1/1.1 bounds of the binaries are written as 0 and 1. With
+bigm="indicator" the LP file has the f(i)-x(i) rows as indicator
+constraints "x = 0 -> f <= verysmall"; MPS has no indicators.
+'''
+import bz2
+import gzip
+import lzma
+
+import numpy as np
+
+from model import INFINITY
+
+
+def _open(path):
+	if path.endswith(".gz"):
+		return gzip.open(path, "wt", compresslevel=1)
+	if path.endswith(".bz2"):
+		return bz2.open(path, "wt", compresslevel=1)
+	if path.endswith(".xz"):
+		return lzma.open(path, "wt", preset=1)
+	return open(path, "w")
+
+
+def _ranges(total, chunk):
+	for lo in range(0, total, chunk):
+		yield lo, min(lo + chunk, total)
+
+
+def _name(name):
+	'''@return the file name of a Model column or row name'''
+	return name.replace("(", "_").replace(",", "_").replace(")", "")
+
+
+def _colnames(model, k):
+	'''@return the file names of the columns k, as _name(model.colname(k))
+	without a call per column'''
+	k = np.asarray(k, dtype=np.int64)
+	e, n = model.num_edges, model.n
+	names = np.empty(len(k), dtype=object)
+	for lo, hi, fmt in ((0, e, "x_%d_%d"), (e, 2*e, "f_%d_%d")):
+		at = np.nonzero((k >= lo) & (k < hi))[0]
+		names[at] = [fmt % t for t in zip(model.ea[k[at] - lo].tolist(), model.eb[k[at] - lo].tolist())]
+	at = np.nonzero((k >= 2*e) & (k < 2*e + n))[0]
+	names[at] = ["xex_%d" % i for i in (k[at] - 2*e).tolist()]
+	at = np.nonzero(k >= 2*e + n)[0]
+	ball, d = np.divmod(k[at] - 2*e - n, 6)
+	names[at] = ["fex_%d_%d" % t for t in zip(ball.tolist(), (d + 1).tolist())]
+	return names.tolist()
+
+
+def _chunks(index, total, chunk):
+	'''Yield lo, hi and the triplet positions of the rows (or columns)
+	lo to hi, with index the rows (or columns) of the triplets. A chunk
+	has at most chunk rows, and at most chunk triplets unless one row has
+	more.'''
+	order = np.argsort(index, kind="stable")
+	starts = np.r_[0, np.cumsum(np.bincount(index, minlength=total))]
+	cuts = np.unique(np.r_[np.searchsorted(starts, np.arange(0, starts[-1], chunk), side="right") - 1,
+						   np.arange(0, total, chunk), total])
+	for lo, hi in zip(cuts[:-1].tolist(), cuts[1:].tolist()):
+		yield lo, hi, order[starts[lo]:starts[hi]]
+
+
+def _bounds(model):
+	'''@return lb, ub of the columns with the binaries rounded to 0 and 1'''
+	integer = np.frombuffer(model.ctype.encode(), dtype="S1") == b"I"
+	lb, ub = model.lb.copy(), model.ub.copy()
+	lb[integer], ub[integer] = np.ceil(lb[integer]), np.floor(ub[integer])
+	return lb + 0.0, ub + 0.0, integer
+
+
+_SENSE = {"E": "=", "L": "<=", "G": ">="}
+
+
+def _number(v):
+	return "+inf" if v >= INFINITY else "-inf" if v <= -INFINITY else "%.17g" % v
+
+
+def _terms(coefs, names):
+	'''@return the "+c name" terms'''
+	return ["%+.17g %s" % t for t in zip(coefs, names)]
+
+
+def _lines(terms, per_line=8):
+	'''@return terms joined a few to a line'''
+	if not terms:
+		return ""
+	if len(terms) <= per_line:
+		return "   " + " ".join(terms) + "\n"
+	return "".join("   " + " ".join(terms[i:i+per_line]) + "\n" for i in range(0, len(terms), per_line))
+
+
+def write_lp(struct, path, chunk=1 << 16):
+	'''Write the MILP of struct in CPLEX LP format.'''
+	model = struct.model()
+	indicator = struct.bigm == "indicator"
+	integer = np.frombuffer(model.ctype.encode(), dtype="S1") == b"I"
+	with _open(path) as out:
+		out.write("\\ Hanging mobile, %d balls, %d rod candidates\n" % (model.n, model.num_edges))
+		out.write("Maximize\n obj:\n")
+		pending = []
+		for lo, hi in _ranges(model.num_cols, chunk):
+			k = lo + np.nonzero(model.obj[lo:hi])[0]
+			pending += _terms(model.obj[k].tolist(), _colnames(model, k))
+			# whole lines only, so that the lines do not depend on chunk
+			full = len(pending) // 8 * 8
+			out.write(_lines(pending[:full]))
+			pending = pending[full:]
+		out.write(_lines(pending))
+
+		out.write("Subject To\n")
+		for lo, hi, at in _chunks(model.rows, model.num_rows, chunk):
+			at = at[model.vals[at] != 0]
+			rows, cols = model.rows[at], model.cols[at]
+			names = _colnames(model, cols)
+			terms = _terms(model.vals[at].tolist(), names)
+			starts = np.searchsorted(rows, np.arange(lo, hi + 1)).tolist()
+			rhs = model.rhs[lo:hi].tolist()
+			lines = []
+			for r in range(lo, hi):
+				s, t = starts[r - lo], starts[r - lo + 1]
+				sense = model.sense[r]
+				if indicator and sense == "L":
+					# the binary of an f(i)-x(i) row switches the rest of the row off
+					on = integer[cols[s:t]]
+					lines.append(" i_%d: %s = 0 ->\n" % (r - 3*model.n, names[s + int(np.argmax(on))]))
+					lines.append(_lines([x for x, o in zip(terms[s:t], on) if not o]))
+				else:
+					lines.append(" r_%d:\n" % r)
+					lines.append(_lines(terms[s:t]))
+				lines.append("   %s %.17g\n" % (_SENSE[sense], rhs[r - lo]))
+			out.writelines(lines)
+
+		out.write("Bounds\n")
+		lb, ub, integer = _bounds(model)
+		for lo, hi in _ranges(model.num_cols, chunk):
+			k = lo + np.nonzero((lb[lo:hi] != 0) | (ub[lo:hi] < INFINITY))[0]
+			out.writelines(" %s <= %s <= %s\n" % (_number(lb[c]), name, _number(ub[c]))
+						   for c, name in zip(k.tolist(), _colnames(model, k)))
+		out.write("Generals\n")
+		for lo, hi in _ranges(model.num_cols, chunk):
+			out.writelines(" %s\n" % name for name in _colnames(model, lo + np.nonzero(integer[lo:hi])[0]))
+		out.write("End\n")
+
+
+def write_mps(struct, path, chunk=1 << 16):
+	'''Write the MILP of struct in free MPS format.'''
+	if struct.bigm == "indicator":
+		raise ValueError("indicator constraints can only be written in LP format")
+	model = struct.model()
+	lb, ub, integer = _bounds(model)
+	with _open(path) as out:
+		out.write("NAME mobile\nOBJSENSE\n    MAX\nROWS\n N obj\n")
+		for lo, hi in _ranges(model.num_rows, chunk):
+			out.writelines(" %s r_%d\n" % (model.sense[r], r) for r in range(lo, hi))
+
+		out.write("COLUMNS\n")
+		marked = False
+		for lo, hi, at in _chunks(model.cols, model.num_cols, chunk):
+			at = at[model.vals[at] != 0]
+			cols, rows, vals = model.cols[at], model.rows[at].tolist(), model.vals[at].tolist()
+			names = _colnames(model, np.arange(lo, hi))
+			starts = np.searchsorted(cols, np.arange(lo, hi + 1)).tolist()
+			lines = []
+			for c in range(lo, hi):
+				name = names[c - lo]
+				if integer[c] != marked:
+					marked = integer[c]
+					lines.append("    MARKER 'MARKER' '%s'\n" % ("INTORG" if marked else "INTEND"))
+				if model.obj[c] != 0:
+					lines.append("    %s obj %.17g\n" % (name, model.obj[c]))
+				s, t = starts[c - lo], starts[c - lo + 1]
+				lines += ["    %s r_%d %.17g\n" % (name, r, v) for r, v in zip(rows[s:t], vals[s:t])]
+			out.writelines(lines)
+		if marked:
+			out.write("    MARKER 'MARKER' 'INTEND'\n")
+
+		out.write("RHS\n")
+		out.writelines("    rhs r_%d %.17g\n" % (r, model.rhs[r]) for r in np.nonzero(model.rhs)[0].tolist())
+
+		out.write("BOUNDS\n")
+		for lo, hi in _ranges(model.num_cols, chunk):
+			names = _colnames(model, np.arange(lo, hi))
+			lines = []
+			for c in range(lo, hi):
+				if lb[c] != 0:
+					lines.append(" LO bnd %s %s\n" % (names[c - lo], _number(lb[c])))
+				if ub[c] < INFINITY or integer[c]:
+					lines.append(" UP bnd %s %s\n" % (names[c - lo], _number(ub[c])))
+			out.writelines(lines)
+		out.write("ENDATA\n")
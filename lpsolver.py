@@ -1,8 +1,93 @@
+import heapq
+import time
 
+import numpy as np
 
 
+class IntLinProgResult:
+	'''The outcome of intlinprog.
+	x, fun: best integer solution found and its objective, None if there is none
+	status: "optimal", "infeasible", "unbounded", "node_limit", "time_limit",
+		"gap_limit" or "cancelled", "approximate" from Structure.solve_approx or
+		"local" from the node edits of Structure
+	bound: best bound on the objective over the unexplored nodes
+	nodes: number of branch-and-bound nodes explored
+	node_times: seconds spent in the LP relaxation of each node
+	history: (seconds, objective, bound) at every new incumbent
+	speedup: cold over warm solve time, set by Structure.resolve
+	stats: a SolveStats, set by Structure.solve when asked for
+	solution: the Solution decoded by Structure.solve along with the stats
+	backend: the name of the solver, see backends.py
+	'''
+	speedup = None;
+	stats = None;
+	solution = None;
+	backend = "native";
+
+	def __init__(self, x, fun, status, bound, nodes, node_times, time, history=()):
+		self.x = x;
+		self.fun = fun;
+		self.status = status;
+		self.bound = bound;
+		self.nodes = nodes;
+		self.node_times = node_times;
+		self.time = time;
+		self.history = list(history);
+
+	@property
+	def time_per_node(self):
+		return self.time / self.nodes if self.nodes else 0.0;
+
+	@property
+	def gap(self):
+		'''@return the relative distance between the objective and the bound'''
+		if self.fun is None or not np.isfinite(self.bound):
+			return None;
+		return (self.fun - self.bound) / max(abs(self.fun), 1e-12);
+
+	def __repr__(self):
+		return "IntLinProgResult(status=%r, fun=%r, nodes=%d, time=%.3fs)" % (
+			self.status, self.fun, self.nodes, self.time);
+
+
+def _stack(A, b, A2, b2):
+	'''Append the rows of A2 * x <= b2 to A * x <= b.'''
+	blocks = [(M, v) for M, v in ((A, b), (A2, b2)) if M is not None and M.shape[0] > 0]
+	if not blocks:
+		return None, None;
+	if len(blocks) == 1:
+		return blocks[0];
+	from scipy import sparse;
+	if any(sparse.issparse(M) for M, v in blocks):
+		A = sparse.vstack([M for M, v in blocks], format="csr");
+	else:
+		A = np.vstack([M for M, v in blocks]);
+	return A, np.concatenate([np.asarray(v, dtype=float) for M, v in blocks]);
+
+
+def _empty(A):
+	return A is None or A.shape[0] == 0;
+
+
+def _polish(linprog, C, A, b, A_eq, b_eq, i, lb, ub, x):
+	'''@return x with x[0:i] rounded and the rest solved again by the LP
+	with x[0:i] fixed there, and its objective, or None when that LP is
+	infeasible'''
+	if i == 0:
+		return x.copy(), float(np.dot(C, x));
+	fixed = np.round(x[:i]);
+	res = linprog(C, A_ub=A, b_ub=b, A_eq=A_eq, b_eq=b_eq,
+				  bounds=np.column_stack([np.r_[fixed, lb[i:]], np.r_[fixed, ub[i:]]]), method="highs");
+	if res.status != 0:
+		return None;
+	x = res.x.copy();
+	x[:i] = fixed;
+	return x, res.fun;
 
-def intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i):
+
+def intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=None,
+			   node_select="best", tol=1e-6, max_nodes=None, time_limit=None, x0=None,
+			   mip_gap=None, callback=None, stop=None, backend="native"):
 	'''
 	Solve the interget linear programming problem:
 	min C^T * x
@@ -11,6 +96,137 @@ def intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i):
 			A_lb * x >= b_lb
 			A_eq * x == b_eq
 			x[0:i] \in {0,1}
+	by branch-and-bound over LP relaxations.
+
+	The matrices may be dense arrays or scipy.sparse matrices, and any of
+	them may be None. bounds is an optional (lb, ub) pair of arrays, by
+	default every variable is non-negative. node_select is "best" for
+	best-bound or "depth" for depth-first node selection. max_nodes and
+	time_limit (seconds) stop the search early with the best incumbent.
+	Binaries within tol of 0 or 1 are taken as integral, the incumbent is
+	then the LP with them rounded and fixed, and the node is branched on
+	when that costs more than its relaxation.
+	x0 is a MIP start: when the LP with x[0:i] fixed to x0[0:i] is feasible
+	its solution is the first incumbent. mip_gap stops the search once the
+	incumbent is within that relative gap of the bound. callback(x, fun,
+	bound) is called on every new incumbent, and the search is cancelled
+	as soon as stop, a threading.Event, is set. backend names another
+	solver or "auto", see backends.py.
+	@return an IntLinProgResult
 	'''
-	pass;
+	if backend != "native":
+		from backends import solve;
+		return solve(backend, C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds,
+					 node_select=node_select, tol=tol, max_nodes=max_nodes, time_limit=time_limit,
+					 x0=x0, mip_gap=mip_gap, callback=callback, stop=stop);
+	# scipy is only imported by the first solve, not by importing this module
+	from scipy.optimize import linprog;
+	start = time.perf_counter();
+	C = np.asarray(C, dtype=float);
+	n = len(C);
+
+	A, b = _stack(A_ub, b_ub, None if _empty(A_lb) else -A_lb,
+				  None if _empty(A_lb) else -np.asarray(b_lb, dtype=float));
+	if _empty(A_eq):
+		A_eq, b_eq = None, None;
+
+	lb = np.zeros(n) if bounds is None else np.array(bounds[0], dtype=float);
+	ub = np.full(n, np.inf) if bounds is None else np.array(bounds[1], dtype=float);
+	lb[:i] = np.ceil(np.maximum(lb[:i], 0.0) - tol);
+	ub[:i] = np.floor(np.minimum(ub[:i], 1.0) + tol);
+
+	incumbent, best = None, np.inf;
+	nodes, node_times = 0, [];
+	history = [];
+	status = "optimal";
+
+	if x0 is not None and i > 0:
+		fixed = np.clip(np.round(np.asarray(x0, dtype=float)[:i]), lb[:i], ub[:i]);
+		res = linprog(C, A_ub=A, b_ub=b, A_eq=A_eq, b_eq=b_eq,
+					  bounds=np.column_stack([np.r_[fixed, lb[i:]], np.r_[fixed, ub[i:]]]),
+					  method="highs");
+		if res.status == 0:
+			incumbent, best = res.x.copy(), res.fun;
+			incumbent[:i] = fixed;
+			history.append((time.perf_counter() - start, best, -np.inf));
+			if callback is not None:
+				callback(incumbent, best, -np.inf);
+
+	# a node is (bound of its parent, tie breaker, lower and upper bounds of x[0:i])
+	open_nodes = [(-np.inf, 0, lb[:i].copy(), ub[:i].copy())];
+	counter = 1;
+	while open_nodes:
+		if max_nodes is not None and nodes >= max_nodes:
+			status = "node_limit";
+			break;
+		if time_limit is not None and time.perf_counter() - start >= time_limit:
+			status = "time_limit";
+			break;
+		if stop is not None and stop.is_set():
+			status = "cancelled";
+			break;
+		if mip_gap is not None and incumbent is not None:
+			# the first open node is the lowest bound with best-bound selection
+			lower = open_nodes[0][0] if node_select == "best" else min(node[0] for node in open_nodes);
+			if best - lower <= mip_gap * max(abs(best), 1e-12):
+				status = "gap_limit";
+				break;
+		if node_select == "best":
+			parent_bound, _, lo, hi = heapq.heappop(open_nodes);
+		else:
+			parent_bound, _, lo, hi = open_nodes.pop();
+		if parent_bound >= best - tol:
+			continue;
+
+		lb[:i], ub[:i] = lo, hi;
+		t = time.perf_counter();
+		res = linprog(C, A_ub=A, b_ub=b, A_eq=A_eq, b_eq=b_eq,
+					  bounds=np.column_stack([lb, ub]), method="highs");
+		node_times.append(time.perf_counter() - t);
+		nodes += 1;
+
+		if res.status == 3 and nodes == 1:
+			status = "unbounded";
+			break;
+		if res.status != 0 or res.fun >= best - tol:
+			continue;    # infeasible or pruned by bound
+
+		frac = np.abs(res.x[:i] - np.round(res.x[:i]));
+		k = int(np.argmax(frac)) if i > 0 else 0;
+		if i == 0 or frac[k] <= tol:
+			# binaries within tol of 0 still let a big-M row carry a force,
+			# the incumbent is the LP with them fixed at their rounded values
+			polished = _polish(linprog, C, A, b, A_eq, b_eq, i, lb, ub, res.x);
+			if polished is not None and polished[1] < best - tol:
+				incumbent, best = polished;
+				history.append((time.perf_counter() - start, best,
+								min([node[0] for node in open_nodes] + [best])));
+				if callback is not None:
+					callback(incumbent, best, history[-1][2]);
+			if polished is not None and polished[1] <= res.fun + tol*max(abs(res.fun), 1.0) or i == 0 or frac[k] == 0:
+				continue;
+			# the rounding costs more than the relaxation, branch on the binary furthest from it
+
+		# branch on the most fractional binary, the nearer side is explored first
+		children = [];
+		for value in (0.0, 1.0):
+			clo, chi = lo.copy(), hi.copy();
+			clo[k] = chi[k] = value;
+			children.append((res.fun, counter, clo, chi));
+			counter += 1;
+		if res.x[k] >= 0.5:
+			children.reverse();
+		if node_select == "best":
+			for child in children:
+				heapq.heappush(open_nodes, child);
+		else:
+			open_nodes.extend(reversed(children));
 
+	if status == "optimal" and incumbent is None:
+		status = "infeasible";
+	if status in ("node_limit", "time_limit", "gap_limit", "cancelled"):
+		bound = min([node[0] for node in open_nodes] + [best]);
+	else:
+		bound = best;
+	return IntLinProgResult(incumbent, None if incumbent is None else best, status,
+							bound, nodes, node_times, time.perf_counter() - start, history);
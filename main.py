@@ -16,7 +16,7 @@ def main():
 	mass  = [1,1,1,1]
 
 	struct = Structure(nodes, mass)
-	struct.solve()
+	print(struct.solve())
 
 	return;
 
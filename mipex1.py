@@ -41,9 +41,7 @@ from __future__ import print_function
 
 import sys
 
-import cplex
 import math
-from cplex.exceptions import CplexError
 
 # data common to all populateby functions
 #my_obj = [1.0, 2.0, 3.0, 1.0]
@@ -56,6 +54,7 @@ from cplex.exceptions import CplexError
 #my_sense = "LLE"
 
 # constants
+infinity = 1.0e+20  # same value as cplex.infinity, cplex is only imported to solve
 m1 = 9999
 m2 = 8888
 verysmall = 0.0
@@ -115,7 +114,7 @@ for i in range(0,my_balls_n):
 m = my_balls_n*my_balls_n -1
 for i in range(0, my_balls_n*my_balls_n):
     m = m+1
-    my_ub[m] = cplex.infinity
+    my_ub[m] = infinity
     my_lb[m] = 0.0
     my_ctype = my_ctype + "C"
 
@@ -127,7 +126,7 @@ for i in range(0, my_balls_n*6):
 
 for i in range(0, my_balls_n*6):
     m = m+1
-    my_ub[m] = cplex.infinity
+    my_ub[m] = infinity
     my_lb[m] = 0.0
     my_ctype = my_ctype + "C"
 
@@ -345,6 +344,8 @@ def populatebynonzero(prob):
 
 
 def mipex1(pop_method):
+    import cplex
+    from cplex.exceptions import CplexError
 
     try:
         my_prob = cplex.Cplex()
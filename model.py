@@ -0,0 +1,407 @@
+'''Index-based sparse assembly of the hanging mobile MILP of revision2.py.
+
+The constraint matrix is produced directly as integer (row, col, val)
+triplets with NumPy; column and row names are only generated on demand.
+The triplet pattern, bounds, types and senses of a size and set of
+options are kept in a ModelTemplate, so models of further geometries of
+that size only fill in their coefficients and right-hand sides.
+
+Every rod candidate is an edge (a, b) with one x and one f column. The
+directed layout of revision2.py has an edge for every ordered pair,
+the compact layout one edge per unordered pair a < b, which drops the
+diagonal and the symmetry rows. With e edges:
+
+Vector x: 2*e+7*n total
+ 0 to (e-1): x(a->b);                                                e entries
+ (e) to (2*e-1): f(a->b);                                            e entries
+ (2*e) to (2*e-1+n): x extern                                        n entries
+ (2*e+n) to (2*e-1+7*n): f extern (+x, -x, +y, -y, +z, -z)         6*n entries
+
+Equations: 2*n*n+3*n total for directed, n*(n-1)/2+4*n for compact
+ x, y, z directions equilibrium * n balls      3*n entries
+ f(i)-x(i) if-else clause                      e+n entries, unless indicators
+ f(a->b) = f(b->a)                             n*(n-1)/2 entries, directed only
+ x(a->b) = x(b->a)                             n*(n-1)/2 entries, directed only
+'''
+import threading
+
+import numpy as np
+
+# same value as cplex.infinity
+INFINITY = 1.0e+20
+
+
+class Model:
+	'''A MILP in the column and row layout of revision2.py.
+	The objective is maximized; the matrix is kept as COO triplets.'''
+	def __init__(self, n, ea, eb, compact, obj, lb, ub, ctype, rhs, sense, rows, cols, vals):
+		self.n = n
+		self.ea = ea            # the rod x(a,b), f(a,b) of column k < e joins ea[k] and eb[k]
+		self.eb = eb
+		self.compact = compact
+		self.obj = obj
+		self.lb = lb
+		self.ub = ub
+		self.ctype = ctype      # one character per column, "I" or "C"
+		self.rhs = rhs
+		self.sense = sense      # one character per row, "E", "L" or "G"
+		self.rows = rows
+		self.cols = cols
+		self.vals = vals
+		# "x(k) = 0 implies f(k) <= verysmall" in place of the big-M rows, as
+		# (binary columns, indicator, col, val triplets, rhs), or None
+		self.indicators = None
+		# the big-M entries -m_rod, -m_ext are vals[bigm_at:bigm_at+e+n]
+		self.bigm = None
+		self.bigm_at = None
+		self.m_rod = None
+		self.m_ext = None
+		# the scaled big-Ms per unit of total mass, see scaled_bigm
+		self.rod_weight = None
+		self.pull_weight = None
+		self.m2 = None
+
+	def set_mass(self, balls_g):
+		'''Change the masses in place: the z equilibrium right-hand sides and,
+		for scaled big-Ms, the big-M entries, which are derived again from
+		the new masses.'''
+		n = self.n
+		g = np.asarray(balls_g, dtype=float)[:n]
+		self.rhs[2:3*n:3] = g
+		if self.bigm == "scaled":
+			self.m_rod, self.m_ext = _scale_bigm(self.rod_weight, self.pull_weight, g, self.m2)
+			e = self.num_edges
+			self.vals[self.bigm_at:self.bigm_at+e] = -self.m_rod
+			self.vals[self.bigm_at+e:self.bigm_at+e+n] = -self.m_ext
+
+	def set_support_bigm(self, m_ext):
+		'''Replace the big-M of the external supports, e.g. by those of a
+		model with more rod candidates.'''
+		e, n = self.num_edges, self.n
+		self.m_ext = np.asarray(m_ext, dtype=float)
+		self.vals[self.bigm_at+e:self.bigm_at+e+n] = -self.m_ext
+
+	@property
+	def num_edges(self):
+		return len(self.ea)
+
+	@property
+	def num_cols(self):
+		return len(self.obj)
+
+	@property
+	def num_rows(self):
+		return len(self.rhs)
+
+	@property
+	def nnz(self):
+		return len(self.vals)
+
+	def colname(self, k):
+		'''@return the revision2.py name of column k'''
+		e = self.num_edges
+		if k < e:
+			return "x(%d,%d)" % (self.ea[k], self.eb[k])
+		if k < 2*e:
+			return "f(%d,%d)" % (self.ea[k-e], self.eb[k-e])
+		if k < 2*e+self.n:
+			return "xex(%d)" % (k - 2*e)
+		k -= 2*e+self.n
+		return "fex(%d,%d)" % (k // 6, k % 6 + 1)
+
+	def rowname(self, k):
+		return "r(%d)" % k
+
+	def colnames(self):
+		return [self.colname(k) for k in range(self.num_cols)]
+
+	def rownames(self):
+		return [self.rowname(k) for k in range(self.num_rows)]
+
+	def iter_rows(self):
+		'''Yield (cols, vals) of every row in order, for printing and debugging.'''
+		order = np.argsort(self.rows, kind="stable")
+		bounds = np.searchsorted(self.rows[order], np.arange(self.num_rows + 1))
+		for r in range(self.num_rows):
+			idx = order[bounds[r]:bounds[r+1]]
+			yield self.cols[idx], self.vals[idx]
+
+	def iter_indicators(self):
+		'''Yield (binary column, cols, vals) of every indicator constraint.'''
+		indvar, rows, cols, vals, _ = self.indicators
+		order = np.argsort(rows, kind="stable")
+		bounds = np.searchsorted(rows[order], np.arange(len(indvar) + 1))
+		for r in range(len(indvar)):
+			idx = order[bounds[r]:bounds[r+1]]
+			yield indvar[r], cols[idx], vals[idx]
+
+	def tocsr(self):
+		'''@return the constraint matrix as a scipy.sparse.csr_matrix'''
+		from scipy.sparse import coo_matrix
+		return coo_matrix((self.vals, (self.rows, self.cols)),
+						  shape=(self.num_rows, self.num_cols)).tocsr()
+
+
+def _pairs_upper(n):
+	'''@return a, b of all pairs a < b in the loop order of revision2.py'''
+	return np.triu_indices(n, 1)
+
+
+def _len_sum(p, chunk=256):
+	'''@return the sum of the lengths of all ordered pairs, in O(chunk*n) memory'''
+	total = 0.0
+	for start in range(0, len(p), chunk):
+		d = p[start:start+chunk, np.newaxis, :] - p[np.newaxis, :, :]
+		total += np.sqrt((d*d).sum(axis=2)).sum()
+	return total
+
+
+def _rod_weight(unit_z):
+	'''@return 1 / |unit_z|, 0 for horizontal rods'''
+	unit_z = np.abs(unit_z)
+	return np.divide(1.0, unit_z, out=np.zeros_like(unit_z), where=unit_z > 0)
+
+
+def scaled_bigm(unit, on, rod, e, g):
+	'''Raise the big-M of every rod and external support where the masses
+	need more than m2.
+	A rod that carries the total hanging mass G alone has the tension
+	G / sin(elevation), and a support that balances its own ball and the
+	rods pulling on it at that tension has components summing to at most
+	|g| plus the |x|+|y|+|z| parts of those rods. Neither is a bound on
+	every optimal mobile: balls held by several flat rods can need far
+	larger tensions. So the big-Ms are never below the constant m2, see
+	_scale_bigm: the scaled model keeps every mobile of the constant one,
+	and its relaxation is no tighter, but it still holds masses too heavy
+	for m2.
+	unit, on, rod: unit vector, ball and rod index of every equilibrium entry
+	@return the bounds per unit of total mass: rod_weight, the big-M of
+	every rod, and pull_weight, the pull of the rods on every ball
+	'''
+	rod_weight = np.zeros(e)
+	rod_weight[rod] = _rod_weight(unit[:, 2])
+	pull = rod_weight[rod] * np.nan_to_num(np.abs(unit)).sum(axis=1)
+	pull_weight = np.bincount(on, weights=pull, minlength=len(g))
+	return rod_weight, pull_weight
+
+
+def _scale_bigm(rod_weight, pull_weight, g, m2):
+	'''@return m_rod, m_ext of scaled_bigm for the masses g, at least m2'''
+	g = np.abs(g)
+	G = g.sum()
+	return np.fmax(float(m2), G*rod_weight), np.fmax(float(m2), g + G*pull_weight)
+
+
+class ModelTemplate:
+	'''The geometry independent part of a Model: the edges, bounds, types,
+	senses and the (row, col) pattern of the matrix, with the positions of
+	the entries that depend on the balls. fill() makes the Model of a
+	geometry by writing the lengths, unit vectors, big-Ms and masses into
+	copies of the value arrays.'''
+	def __init__(self, n, ea, eb, s1, s2, compact, bigm="constant", m2=8888, verysmall=0.0):
+		self.n = n
+		self.ea = ea
+		self.eb = eb
+		self.compact = compact
+		self.bigm = bigm
+		self.m2 = m2
+		e = len(ea)
+		ncols = 2*e+7*n
+		half = 0 if compact else len(s1)
+		nact = 0 if bigm == "indicator" else e+n
+		nrows = 3*n+nact+2*half
+
+		# x(a->a) has to be 0, every other x is either 0 or 1; forces are non-negative
+		self.lb = np.zeros(ncols)
+		self.ub = np.full(ncols, INFINITY)
+		self.lb[:e] = -0.1
+		self.ub[:e] = np.where(ea != eb, 1.1, 0.1)
+		self.lb[2*e:2*e+n] = -0.1
+		self.ub[2*e:2*e+n] = 1.1
+		self.ctype = "I"*e + "C"*e + "I"*n + "C"*6*n
+
+		self.rhs = np.zeros(nrows)
+		self.rhs[3*n:3*n+nact] = verysmall
+		self.sense = "EEE"*n + "L"*nact + "E"*(2*half)
+
+		ball = np.arange(n)
+		fex = 2*e+n+6*ball
+
+		# 3*n equilibrium: f(a->b) pulls ball b along the unit vector towards a,
+		# and in the compact layout also pulls ball a towards b
+		self.k = k = np.nonzero(ea != eb)[0]
+		if compact:
+			on, col = np.r_[eb[k], ea[k]], np.r_[e+k, e+k]
+		else:
+			on, col = eb[k], e+k
+		self.on, self.rod = on, col-e
+		eq_rows = [3*on+d for d in range(3)] + [3*ball+d for d in range(3)]*2
+		eq_cols = [col]*3 + [fex+2*d for d in range(3)] + [fex+2*d+1 for d in range(3)]
+		eq_vals = [np.zeros(len(on))]*3 + [np.ones(n)]*3 + [-np.ones(n)]*3
+
+		# when x is 0, f has to be 0 for internal and external fs
+		k = np.arange(e)
+		act_rows = [3*n+k, np.repeat(3*n+e+ball, 6)]
+		act_cols = [e+k, (fex[:, np.newaxis] + np.arange(6)).ravel()]
+		act_vals = [np.ones(e), np.ones(6*n)]
+		self.indicators = None
+		if bigm == "indicator":
+			self.indicators = (np.r_[k, 2*e+ball], np.concatenate(act_rows)-3*n,
+							   np.concatenate(act_cols), np.concatenate(act_vals), verysmall)
+			act_rows, act_cols, act_vals = [], [], []
+		else:
+			act_rows += [3*n+k, 3*n+e+ball]
+			act_cols += [k, 2*e+ball]
+			act_vals += [np.zeros(e), np.zeros(n)]
+
+		# f(a,b)=f(b,a) and x(a,b)=x(b,a)
+		sym_rows, sym_cols, sym_vals = [], [], []
+		if not compact:
+			s = 3*n+nact+np.arange(half)
+			sym_rows = [s, s, s+half, s+half]
+			sym_cols = [e+s1, e+s2, s1, s2]
+			sym_vals = [np.ones(half), -np.ones(half), np.ones(half), -np.ones(half)]
+
+		self.rows = np.concatenate(eq_rows + act_rows + sym_rows).astype(np.int64)
+		self.cols = np.concatenate(eq_cols + act_cols + sym_cols).astype(np.int64)
+		self.vals = np.concatenate(eq_vals + act_vals + sym_vals)
+		self.bigm_at = None if self.indicators is not None else 3*len(on) + 6*n + e + 6*n
+
+	@property
+	def nbytes(self):
+		'''@return the bytes of the arrays of the template'''
+		arrays = list(vars(self).values()) + list(self.indicators or ())
+		return sum(v.nbytes for v in arrays if isinstance(v, np.ndarray))
+
+	def fill(self, p, g, len_sum=None, geometry=None):
+		'''@return the Model of the balls p (n, 3) with masses g; len_sum
+		defaults to the sum of the edge lengths'''
+		n, ea, eb, e, k = self.n, self.ea, self.eb, len(self.ea), self.k
+		g = np.asarray(g, dtype=float)[:n]
+		if geometry is None:
+			diff = p[ea] - p[eb]   # diff[k] points from ball eb[k] to ball ea[k]
+			length = np.sqrt((diff*diff).sum(axis=1))
+			# coinciding balls have no direction, a rod between them pulls nowhere
+			with np.errstate(divide="ignore", invalid="ignore"):
+				unit = np.nan_to_num(diff[k] / length[k][:, np.newaxis])
+		else:
+			length = geometry[0][ea, eb]
+			unit = geometry[1][ea[k], eb[k]]
+		if self.compact:
+			unit = np.r_[unit, -unit]
+		if len_sum is None:
+			len_sum = length.sum() * (2.0 if self.compact else 1.0)
+
+		# objective: -edge_length for each x(a->b), -len_sum-1.0 for each x extern
+		obj = np.zeros(len(self.lb))
+		obj[:e] = -length * (2.0 if self.compact else 1.0)
+		obj[2*e:2*e+n] = -len_sum-1.0
+		rhs = self.rhs.copy()
+		rhs[2:3*n:3] = g
+
+		vals = self.vals.copy()
+		K = len(unit)
+		vals[:3*K] = unit.T.ravel()
+		m_rod = m_ext = rod_weight = pull_weight = None
+		if self.indicators is None:
+			if self.bigm == "constant":
+				m_rod, m_ext = np.full(e, float(self.m2)), np.full(n, float(self.m2))
+			else:
+				rod_weight, pull_weight = scaled_bigm(unit, self.on, self.rod, e, g)
+				m_rod, m_ext = _scale_bigm(rod_weight, pull_weight, g, self.m2)
+			vals[self.bigm_at:self.bigm_at+e] = -m_rod
+			vals[self.bigm_at+e:self.bigm_at+e+n] = -m_ext
+
+		model = Model(n, ea, eb, self.compact, obj, self.lb.copy(), self.ub.copy(), self.ctype, rhs,
+					  self.sense, self.rows, self.cols, vals)
+		model.indicators = self.indicators
+		model.bigm = self.bigm
+		model.bigm_at = self.bigm_at
+		model.m_rod, model.m_ext = m_rod, m_ext
+		model.rod_weight, model.pull_weight = rod_weight, pull_weight
+		model.m2 = self.m2
+		return model
+
+
+_TEMPLATES = {}
+# guards _TEMPLATES, which solves in threads (solve_async, sweeps) share
+_TEMPLATES_LOCK = threading.Lock()
+# the templates kept are at most this many bytes, larger ones are not kept
+TEMPLATE_CACHE_BYTES = 1 << 28
+
+
+def clear_templates():
+	'''Drop every cached ModelTemplate.'''
+	with _TEMPLATES_LOCK:
+		_TEMPLATES.clear()
+
+
+def template(n, compact=False, bigm="constant", m2=8888, verysmall=0.0):
+	'''@return the cached ModelTemplate of all pairs of n balls; models of
+	the same size and options share its pattern arrays. The least recently
+	used templates are dropped to keep the cache within
+	TEMPLATE_CACHE_BYTES. Safe to call from several threads.'''
+	key = (n, compact, bigm, m2, verysmall)
+	with _TEMPLATES_LOCK:
+		if key in _TEMPLATES:
+			_TEMPLATES[key] = _TEMPLATES.pop(key)   # most recently used last
+			return _TEMPLATES[key]
+	# built outside the lock, a thread building the same template meanwhile wins
+	if compact:
+		ea, eb = _pairs_upper(n)
+		s1 = s2 = None
+	else:
+		ea, eb = np.divmod(np.arange(n*n), n)
+		a, b = _pairs_upper(n)
+		s1, s2 = b*n+a, a*n+b
+	made = ModelTemplate(n, ea, eb, s1, s2, compact, bigm, m2, verysmall)
+	size = made.nbytes
+	if size > TEMPLATE_CACHE_BYTES:
+		return made
+	with _TEMPLATES_LOCK:
+		if key in _TEMPLATES:
+			return _TEMPLATES[key]
+		total = sum(t.nbytes for t in _TEMPLATES.values())
+		while _TEMPLATES and total + size > TEMPLATE_CACHE_BYTES:
+			total -= _TEMPLATES.pop(next(iter(_TEMPLATES))).nbytes
+		_TEMPLATES[key] = made
+	return made
+
+
+def build_model(balls_x, balls_y, balls_z, balls_g, m2=8888, verysmall=0.0, compact=False,
+				pairs=None, bigm="constant", geometry=None):
+	'''Build the revision2.py formulation for the given balls.
+	With compact=True there is one x and one f per unordered pair, whose
+	objective weight counts the rod in both directions, so the optimal
+	mobile and objective value are those of the directed model.
+	pairs restricts the rod candidates to the given (a, b) arrays with
+	a < b; the weight of the external supports is still based on all pairs.
+	bigm is "constant" for m2 on every f(i)-x(i) row, "scaled" for m2
+	raised where the masses need more, see scaled_bigm, or
+	"indicator" to leave those rows out of the matrix and return them as
+	Model.indicators.
+	geometry is an optional (distances (n, n), unit (n, n, 3)) pair of
+	precomputed arrays, unit[a, b] pointing from ball b to ball a.
+	Without pairs the pattern comes from the template cache, so only the
+	coefficients are computed for every further model of that size.
+	@return a Model
+	'''
+	if bigm not in ("constant", "scaled", "indicator"):
+		raise ValueError("bigm must be constant, scaled or indicator, not %r" % (bigm,))
+	p = np.column_stack([np.asarray(balls_x, dtype=float),
+						 np.asarray(balls_y, dtype=float),
+						 np.asarray(balls_z, dtype=float)])
+	n = len(p)
+	if pairs is None:
+		return template(n, compact, bigm, m2, verysmall).fill(p, balls_g, geometry=geometry)
+
+	# the symmetry rows tie x(s1), f(s1) to x(s2), f(s2) in the directed layout
+	a, b = (np.asarray(v, dtype=np.int64) for v in pairs)
+	if compact:
+		ea, eb = a, b
+	else:
+		ea, eb = np.r_[a, b], np.r_[b, a]
+	s1, s2 = np.arange(len(a), 2*len(a)), np.arange(len(a))
+	len_sum = _len_sum(p) if geometry is None else geometry[0].sum()
+	return ModelTemplate(n, ea, eb, s1, s2, compact, bigm, m2, verysmall).fill(
+		p, balls_g, len_sum, geometry)
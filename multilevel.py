@@ -0,0 +1,219 @@
+'''Coarsen, solve and refine mobiles of thousands of balls.
+
+The balls are clustered by k-means into super-nodes of about ratio
+balls, with the total mass at the centre of mass of each cluster, and
+the super-nodes again, until at most coarse_size are left. That coarse
+mobile is solved with the whole formulation. Every level is then
+refined on its own: each super-node is replaced by its members in a
+small MILP which offers all rods between them, and for every rod of the
+coarser mobile to a super-node nearer to a support (a parent) one rod
+to the nearest member of that parent. That member, the anchor, is
+supported for free in the small MILP; the force on its support is what
+the rods put on the anchor, so it is added to the load of the anchor
+when its own super-node is refined later. The super-nodes are refined
+from the ones furthest from the supports inwards, so the merged rods
+and supports of a level form a mobile in equilibrium.
+
+time_limit is the budget of the whole solve: the coarse mobile may use
+half of it, and each small MILP an equal share of what is left for the
+ones still to come. Once the budget is spent, the super-nodes left are
+refined by supporting all of their members, which always is a mobile.
+
+The result is feasible but not proven optimal, its gap is reported by
+Solution.gap. Its bound is
+min(2 S, S + 2 T), S the weight of a support and T a lower bound on the
+length of a spanning tree, the Euclidean minimum spanning tree when the
+balls span 3D space: a mobile either has two supports, or one support
+and rods joining all balls.
+'''
+import time
+import warnings
+
+import numpy as np
+from scipy.cluster.vq import kmeans2
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import dijkstra, minimum_spanning_tree
+from scipy.spatial import cKDTree, Delaunay, QhullError
+
+from model import _len_sum
+from solution import Solution
+
+
+def coarsen(points, mass, ratio=8, seed=0):
+	'''@return the label of the super-node of every ball, and the centres of
+	mass and total masses of the super-nodes; no super-node has more than
+	2*ratio balls'''
+	rng = np.random.default_rng(seed)
+
+	def split(idx):
+		with warnings.catch_warnings():
+			warnings.simplefilter("ignore")   # empty clusters are dropped by the renumbering
+			_, part = kmeans2(points[idx], int(np.ceil(len(idx) / ratio)), minit="++", rng=rng)
+		if len(np.unique(part)) == 1:
+			# k-means finds no split of coinciding balls, cut them in halves
+			part = np.arange(len(idx)) * 2 // len(idx)
+		return part
+
+	labels = split(np.arange(len(points)))
+	while True:
+		labels = np.unique(labels, return_inverse=True)[1]
+		large = np.nonzero(np.bincount(labels) > 2*ratio)[0]
+		if not len(large):
+			break
+		for c in large:
+			idx = np.nonzero(labels == c)[0]
+			labels[idx] = labels.max() + 1 + split(idx)
+	weight = np.bincount(labels, weights=mass)
+	centres = np.column_stack([np.bincount(labels, weights=mass*points[:, k]) for k in range(3)])
+	count = np.bincount(labels).astype(float)
+	centres = np.where(weight[:, np.newaxis] != 0, centres / np.where(weight == 0, 1.0, weight)[:, np.newaxis],
+					   np.column_stack([np.bincount(labels, weights=points[:, k]) for k in range(3)]) / count[:, np.newaxis])
+	return labels, centres, weight
+
+
+def tree_bound(points):
+	'''@return a lower bound on the length of a tree joining all points: the
+	Euclidean minimum spanning tree, which is part of the Delaunay graph,
+	or the sum of the nearest neighbour distances but the largest for
+	points without a 3D triangulation'''
+	n = len(points)
+	if n < 2:
+		return 0.0
+	try:
+		simplices = Delaunay(points).simplices
+	except (QhullError, ValueError):
+		d, _ = cKDTree(points).query(points, k=2)
+		return float(d[:, 1].sum() - d[:, 1].max())
+	a = np.concatenate([simplices[:, i] for i in range(4) for j in range(i+1, 4)])
+	b = np.concatenate([simplices[:, j] for i in range(4) for j in range(i+1, 4)])
+	length = np.sqrt(((points[a] - points[b])**2).sum(axis=1))
+	# duplicate edges keep the smallest entry, coinciding points a tiny one
+	graph = coo_matrix((np.fmax(length, 1e-300), (a, b)), shape=(n, n)).tocsr()
+	return float(minimum_spanning_tree(graph).sum())
+
+
+def lower_bound(points):
+	'''@return the lower bound of the revision2 objective of any mobile of points'''
+	S = _len_sum(points) + 1.0
+	return min(2.0*S, S + 2.0*tree_bound(points))
+
+
+def _refine_one(cls, points, mass, load, members, anchors, kwargs, options):
+	'''Solve the members hanging from the anchors, which are supported for
+	free, or support every member when options has no time left.
+	@return the Solution in the local numbering, members first'''
+	idx = np.r_[members, anchors].astype(np.int64)
+	k, m = len(members), len(anchors)
+	# the balls carry their mass and the loads of their refined children
+	rhs = np.column_stack([load[members, 0], load[members, 1], mass[members] + load[members, 2]])
+	if options.get("time_limit") is not None and options["time_limit"] <= 0:
+		force = np.column_stack([np.fmax(rhs, 0.0), np.fmax(-rhs, 0.0)])[:, [0, 3, 1, 4, 2, 5]]
+		return Solution("time_limit", None, None, np.empty((0, 2), dtype=np.int64), np.empty(0),
+						np.arange(k), force)
+	a, b = np.triu_indices(k, 1)
+	pairs = (np.r_[a, np.repeat(np.arange(k), m)], np.r_[b, np.tile(k + np.arange(m), k)])
+	local = cls(points[idx], np.r_[np.abs(rhs).sum(axis=1), np.zeros(m)], compact=True, pairs=pairs, **kwargs)
+	model = local.model()
+	model.rhs[:3*k] = rhs.ravel()
+	model.rhs[3*k:3*(k+m)] = 0.0
+	e = model.num_edges
+	model.lb[2*e+k:2*e+k+m] = model.ub[2*e+k:2*e+k+m] = 1.0
+	model.obj[2*e+k:2*e+k+m] = 0.0
+	# supporting every ball is always feasible, the start and the fallback of time limited solves
+	solution = local.decode(local.solve(x0=np.r_[np.zeros(e), np.ones(k+m)], **options))
+	if solution.objective is None:
+		return _refine_one(cls, points, mass, load, members, anchors, kwargs, {"time_limit": 0})
+	return solution
+
+
+def _refine(cls, points, mass, groups, rods, supports, kwargs, options, deadline=None, left=0):
+	'''Replace the super-nodes of the mobile (rods, supports) by their
+	members groups. Each small MILP gets an equal share of the time to
+	deadline, a time.perf_counter() value, with left of them still to come
+	after this level. @return rods, tension, supports, support_force of the
+	members'''
+	count = len(groups)
+	graph = coo_matrix((np.ones(len(rods)), (rods[:, 0], rods[:, 1])), shape=(count, count))
+	depth = np.full(count, np.inf)
+	if len(supports):
+		depth = dijkstra(graph, directed=False, indices=supports, unweighted=True, min_only=True)
+	load = np.zeros((len(points), 3))
+	out_rods, tension, out_supports, force = [], [], [], []
+	# the super-nodes furthest from a support first, unreached ones as roots
+	for c in sorted(range(count), key=lambda c: -depth[c] if np.isfinite(depth[c]) else -np.inf):
+		members = groups[c]
+		near = np.r_[rods[rods[:, 0] == c, 1], rods[rods[:, 1] == c, 0]]
+		parents = [d for d in np.unique(near) if depth[d] < depth[c]]
+		anchors = []
+		for d in parents:
+			gap = points[members, np.newaxis, :] - points[np.newaxis, groups[d], :]
+			anchors.append(groups[d][np.argmin((gap*gap).sum(axis=2)) % len(groups[d])])
+		anchors = np.unique(np.asarray(anchors, dtype=np.int64))
+		if deadline is not None:
+			options = dict(options, time_limit=(deadline - time.perf_counter()) / (count - len(out_rods) + left))
+		part = _refine_one(cls, points, mass, load, members, anchors, kwargs, options)
+		idx = np.r_[members, anchors]
+		k = len(members)
+		out_rods.append(idx[part.rods].reshape(-1, 2))
+		tension.append(part.tension)
+		own = part.supports < k
+		out_supports.append(idx[part.supports[own]])
+		force.append(part.support_force[own])
+		# the rods pull the anchors by minus the force on their free supports
+		f = part.support_force[~own]
+		np.add.at(load, idx[part.supports[~own]], f[:, 0::2] - f[:, 1::2])
+	empty = np.empty((0, 2), dtype=np.int64)
+	return (np.concatenate(out_rods + [empty]), np.concatenate(tension + [np.empty(0)]),
+			np.concatenate(out_supports + [np.empty(0, dtype=np.int64)]),
+			np.concatenate(force + [np.empty((0, 6))]))
+
+
+def solve_multilevel(struct, ratio=8, coarse_size=40, seed=0, **options):
+	'''Solve struct by coarsening to at most coarse_size super-nodes and
+	refining level by level, options are passed on to Structure.solve,
+	and time_limit bounds the whole solve.
+	@return the Solution in the numbering of struct, with status
+	"approximate", or "time_limit" when the budget ran out, and the bound
+	of lower_bound'''
+	start = time.perf_counter()
+	points = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+	mass = np.asarray(struct.mass, dtype=float)[:len(points)]
+	cls = type(struct)
+	kwargs = {"bigm": struct.bigm}
+
+	# levels[l] = (points, mass, labels into level l+1)
+	levels = []
+	p, g = points, mass
+	while len(p) > coarse_size:
+		labels, centres, weight = coarsen(p, g, ratio, seed)
+		if len(centres) == len(p):
+			break
+		levels.append((p, g, labels))
+		p, g = centres, weight
+	budget = options.get("time_limit")
+	deadline = None if budget is None else start + budget
+	coarse = cls(p, g, compact=struct.compact, neighbours=struct.neighbours, radius=struct.radius,
+				 bigm=struct.bigm)
+	x0 = np.r_[np.zeros(coarse.model().num_edges), np.ones(len(p))]
+	limit = {} if not levels or deadline is None else {"time_limit": (deadline - time.perf_counter()) / 2.0}
+	solution = coarse.decode(coarse.solve(**dict({"x0": x0}, **dict(options, **limit))))
+	if not levels:
+		return solution
+	# without a coarse mobile every super-node is refined on its own
+	rods, supports = solution.rods, solution.supports
+	left = sum(labels.max() + 1 for _, _, labels in levels)
+	for p, g, labels in reversed(levels):
+		groups = [np.nonzero(labels == c)[0] for c in range(labels.max() + 1)]
+		left -= len(groups)
+		rods, tension, supports, force = _refine(cls, p, g, groups, rods, supports, kwargs, options,
+												 deadline, left)
+	out_of_time = deadline is not None and time.perf_counter() >= deadline
+
+	length = np.sqrt(((points[rods[:, 0]] - points[rods[:, 1]])**2).sum(axis=1))
+	# the objective of revision2 weighs every rod twice, see model.build_model
+	rod_cost = float(2.0*length.sum())
+	support_cost = float((_len_sum(points) + 1.0)*len(supports))
+	merged = Solution("time_limit" if out_of_time else "approximate", rod_cost + support_cost,
+					  lower_bound(points), np.sort(rods, axis=1), tension, supports, force.reshape(-1, 6),
+					  rod_cost, support_cost)
+	return merged.renumber(np.arange(len(points)))
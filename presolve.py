@@ -0,0 +1,247 @@
+'''Checks and reductions of a Structure before branch-and-bound.
+
+Balls closer than tol (relative to the size of the instance) are merged
+into one ball with their total mass, rejected with a ValueError, or kept
+with the rods between them fixed to zero. A rod between balls at the
+same point has no direction and carries no force, so for those the
+reduction loses nothing; between balls merely closer than tol a short
+rod can still carry a force, and the result is no longer proven optimal.
+A merged ball hands its rods and support on to all of its balls, see
+Presolved.solve.
+
+Degenerate layouts are settled without branching: a ball with mass and
+no rod candidate pulling it up, as every ball on a horizontal line or
+plane, and every ball with mass on a line that is not vertical needs a
+support of its own. Once every ball with mass has one, a rod can only
+cost, and all rods are fixed to zero.
+
+The input is checked for finite coordinates and masses, and an LP over
+the continuous relaxation rejects an impossible instance before any
+branching.
+'''
+import time
+
+import numpy as np
+from scipy.optimize import linprog
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from scipy.spatial import cKDTree
+
+from candidates import candidate_pairs
+
+
+class PresolveReport:
+	'''What presolve found and removed.'''
+	def __init__(self):
+		self.balls = 0
+		self.coincident = []      # arrays of the original balls that coincide
+		self.exact = True         # whether they all lie at the very same point
+		self.fixed_rods = 0       # rods fixed to zero
+		self.fixed_supports = 0   # supports fixed to one
+		self.columns = 0          # columns removed or fixed
+		self.rows = 0             # rows removed
+		self.feasible = None      # None when the LP was not run
+		self.time = 0.0
+
+	def __repr__(self):
+		return ("PresolveReport(balls=%d, coincident=%d, exact=%r, fixed_rods=%d, fixed_supports=%d, "
+				"columns=%d, rows=%d, feasible=%r, time=%.3fs)" % (
+					self.balls, len(self.coincident), self.exact, self.fixed_rods, self.fixed_supports,
+					self.columns, self.rows, self.feasible, self.time))
+
+
+class Presolved:
+	'''The presolved structure; ball c of it is ball representative[c]
+	of the original structure, and label[k] is the ball of it that the
+	original ball k was merged into, None without merging.'''
+	def __init__(self, structure, representative, report, original=None, label=None):
+		self.structure = structure
+		self.representative = representative
+		self.report = report
+		self.original = original
+		self.label = label
+
+	def restore(self, solution):
+		'''@return the Solution of the presolved structure in the original
+		numbering, only the representatives of merged balls take part'''
+		return solution.renumber(self.representative)
+
+	def solve(self, **options):
+		'''@return the Solution of the original structure. Without merging
+		it is that of the presolved structure, "approximate" when rods
+		between balls closer than tol but not at the same point were fixed.
+		Merged balls are expanded, see expand.'''
+		solution = self.structure.decode(self.structure.solve(**options))
+		if self.label is None:
+			solution = self.restore(solution)
+			if not self.report.exact:
+				solution.bound = None
+				if solution.status == "optimal":
+					solution.status = "approximate"
+			return solution
+		if solution.objective is None:
+			return solution
+		return self.expand(solution, **options)
+
+	def expand(self, solution, **options):
+		'''@return the Solution of the original structure for the Solution of
+		the presolved one: every ball merged into c gets the support of c
+		and a rod to every ball merged into d for every rod (c, d). Their
+		forces are solved again with these rods and supports fixed, and the
+		objective is that of the original structure. When they have no
+		forces there, as balls closer than tol may not, the original
+		structure is solved instead, with options. Its bound is that of the
+		presolved solution when the merged balls lie at the same point,
+		which only makes a mobile cheaper, and it is "optimal" when it
+		attains that bound.'''
+		original = self.original
+		p = np.asarray(original.nodes, dtype=float).reshape(-1, 3)
+		n = len(p)
+		label = self.label
+		order = np.argsort(label, kind="stable")
+		at = np.searchsorted(label[order], np.arange(len(self.representative) + 1))
+		rods = [np.array(np.meshgrid(order[at[c]:at[c+1]], order[at[d]:at[d+1]])).reshape(2, -1).T
+				for c, d in solution.rods.tolist()]
+		rods = np.sort(np.concatenate(rods + [np.empty((0, 2), dtype=np.int64)]), axis=1)
+		supported = np.isin(label, solution.supports)
+
+		fixed = type(original)(p, original.mass, compact=True, bigm=original.bigm, pairs=(rods[:, 0], rods[:, 1]))
+		model = fixed.model()
+		e = model.num_edges
+		model.lb[:e] = 1.0
+		model.lb[2*e:2*e+n] = model.ub[2*e:2*e+n] = supported
+		result = fixed.solve()
+		if result.x is None:
+			return original.decode(original.solve(**options))
+		expanded = fixed.decode(result)
+		expanded.status, expanded.bound = solution.status, None
+		if self.report.exact and solution.bound is not None:
+			expanded.bound = solution.bound
+		if expanded.status == "optimal" and (expanded.bound is None or expanded.objective - expanded.bound >
+											 1e-6*max(abs(expanded.objective), 1.0)):
+			expanded.status = "approximate"
+		return expanded
+
+
+def _size(n, e, compact, pairs):
+	'''@return the columns and rows of a Structure model with e edges'''
+	half = 0 if compact else (e // 2 if pairs else (e - n) // 2)
+	return 2*e + 7*n, 3*n + e + n + 2*half
+
+
+def _edges(struct, p):
+	'''@return the number of edges of the model of struct'''
+	n = len(p)
+	pairs = struct.pairs
+	if pairs is None and (struct.neighbours is not None or struct.radius is not None):
+		pairs = candidate_pairs(p, struct.neighbours, struct.radius)
+	if pairs is not None:
+		return len(pairs[0]) * (1 if struct.compact else 2), True
+	return (n*(n-1)//2 if struct.compact else n*n), False
+
+
+def _needs_support(p, g, model, distance, tol):
+	'''@return whether every ball of the model needs a support of its own:
+	it has mass but no rod candidate pulls it against its weight, or all
+	balls lie on a line that is not vertical, so that no rod pulls it
+	straight up'''
+	n = len(p)
+	if n >= 2:
+		centred = p - p.mean(axis=0)
+		_, sigma, vt = np.linalg.svd(centred, full_matrices=False)
+		if sigma[1] <= distance and abs(vt[0, 2]) < 1.0 - tol:
+			return g != 0
+	ea, eb = model.ea, model.eb
+	d = p[ea] - p[eb]
+	length = np.sqrt((d*d).sum(axis=1))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		up = np.nan_to_num(d[:, 2] / length)
+	# the f of an edge pulls eb towards ea, in the compact layout also ea towards eb
+	highest = np.full(n, -np.inf)
+	lowest = np.full(n, np.inf)
+	np.maximum.at(highest, eb, up)
+	np.minimum.at(lowest, eb, up)
+	if model.compact:
+		np.maximum.at(highest, ea, -up)
+		np.minimum.at(lowest, ea, -up)
+	return ((g > 0) & (highest <= tol)) | ((g < 0) & (lowest >= -tol))
+
+
+def presolve(struct, tol=1e-6, coincident="merge", check=True):
+	'''Presolve struct. coincident is "merge", "reject" or "fix".
+	@return a Presolved'''
+	start = time.perf_counter()
+	report = PresolveReport()
+	p = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+	n = report.balls = len(p)
+	g = np.asarray(struct.mass, dtype=float)
+	if len(g) < n:
+		raise ValueError("%d balls but %d masses" % (n, len(g)))
+	g = g[:n]
+	if not (np.isfinite(p).all() and np.isfinite(g).all()):
+		raise ValueError("coordinates and masses have to be finite")
+
+	size = np.linalg.norm(np.ptp(p, axis=0)) if n else 0.0
+	close = cKDTree(p).query_pairs(tol * max(size, 1.0), output_type="ndarray")
+	count, labels = connected_components(
+		coo_matrix((np.ones(len(close)), (close[:, 0], close[:, 1])), shape=(n, n)), directed=False)
+	members = np.bincount(labels, minlength=count)
+	report.coincident = [np.nonzero(labels == c)[0] for c in np.nonzero(members > 1)[0]]
+	report.exact = all(np.ptp(p[group], axis=0).max() == 0 for group in report.coincident)
+	if report.coincident and coincident == "reject":
+		raise ValueError("coinciding balls: %s" % "; ".join(
+			", ".join(map(str, group)) for group in report.coincident))
+
+	e, pruned = _edges(struct, p)
+	kwargs = {"compact": struct.compact, "neighbours": struct.neighbours, "radius": struct.radius,
+			  "bigm": struct.bigm}
+	if coincident == "merge" and report.coincident:
+		# every group becomes its lowest ball, the groups keep their order
+		first = np.full(count, n)
+		np.minimum.at(first, labels, np.arange(n))
+		order = np.argsort(first)
+		rank = np.empty(count, dtype=np.int64)
+		rank[order] = np.arange(count)
+		label = rank[labels]
+		representative = first[order]
+		nodes = np.column_stack([np.bincount(label, weights=p[:, k]) for k in range(3)]) / members[order, np.newaxis]
+		pairs = None
+		if struct.pairs is not None:
+			a, b = (label[np.asarray(v)] for v in struct.pairs)
+			keep = np.unique(np.sort(np.column_stack([a, b])[a != b], axis=1), axis=0)
+			pairs = (keep[:, 0], keep[:, 1])
+		reduced = type(struct)(nodes, np.bincount(label, weights=g), pairs=pairs, **kwargs)
+	else:
+		reduced = type(struct)(p, g, pairs=struct.pairs, **kwargs)
+		representative = np.arange(n)
+		label = None
+
+	model = reduced.model()
+	ne = model.num_edges
+	fixed = np.zeros(ne, dtype=bool)
+	if coincident == "fix" and report.coincident:
+		fixed |= (model.ea != model.eb) & (labels[model.ea] == labels[model.eb])
+	need = _needs_support(reduced.nodes, reduced.mass[:len(reduced.nodes)], model, tol * max(size, 1.0), tol)
+	model.lb[2*ne:2*ne+model.n][need] = model.ub[2*ne:2*ne+model.n][need] = 1.0
+	report.fixed_supports = int(need.sum())
+	if (need | (reduced.mass[:model.n] == 0)).all():
+		fixed |= model.ea != model.eb
+	model.ub[:ne][fixed] = model.ub[ne:2*ne][fixed] = 0.0
+	report.fixed_rods = int(fixed.sum())
+	columns, rows = _size(n, e, struct.compact, pruned)
+	report.columns = columns - model.num_cols + 2*report.fixed_rods + report.fixed_supports
+	report.rows = rows - model.num_rows
+
+	if check:
+		C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = reduced.build_intlinprog()
+		lb, ub = reduced.bounds()
+		lb, ub = lb.copy(), ub.copy()
+		lb[:i], ub[:i] = np.clip(lb[:i], 0.0, 1.0), np.clip(ub[:i], 0.0, 1.0)
+		# only feasibility matters, the model has no >= rows
+		res = linprog(np.zeros(len(C)), A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq,
+					  bounds=np.column_stack([lb, ub]), method="highs")
+		report.feasible = res.status != 2
+		if not report.feasible:
+			raise ValueError("the relaxation of the model is infeasible")
+	report.time = time.perf_counter() - start
+	return Presolved(reduced, representative, report, struct, label)
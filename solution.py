@@ -0,0 +1,133 @@
+'''The decoded solution of a hanging mobile: its rods and external supports.'''
+import json
+
+import numpy as np
+
+
+class Solution:
+	'''The rods (a, b), a < b, with their tensions and the external
+	supports with their six force components (+x, -x, +y, -y, +z, -z)
+	of a solved Structure, in the node numbering of the Structure.
+	rod_cost and support_cost split the objective between the weights of
+	the rods and of the supports.'''
+	def __init__(self, status, objective, bound, rods, tension, supports, support_force,
+				 rod_cost=None, support_cost=None):
+		self.status = status
+		self.objective = objective
+		self.bound = bound
+		self.rods = rods                      # (k, 2) int array
+		self.tension = tension                # (k,) array
+		self.supports = supports              # (s,) int array
+		self.support_force = support_force    # (s, 6) array
+		self.rod_cost = rod_cost
+		self.support_cost = support_cost
+
+	@property
+	def gap(self):
+		'''@return the relative gap between the objective and the bound, or
+		None without either'''
+		if self.objective is None or self.bound is None:
+			return None
+		return (self.objective - self.bound) / max(abs(self.objective), 1e-12)
+
+	def renumber(self, perm):
+		'''@return this solution with node c renamed to perm[c]'''
+		perm = np.asarray(perm)
+		rods = np.sort(perm[self.rods].reshape(-1, 2), axis=1)
+		r = np.lexsort((rods[:, 1], rods[:, 0]))
+		supports = perm[self.supports]
+		s = np.argsort(supports)
+		return Solution(self.status, self.objective, self.bound, rods[r], self.tension[r],
+						supports[s], self.support_force[s], self.rod_cost, self.support_cost)
+
+	def adjacency(self, n=None):
+		'''@return the symmetric (n, n) sparse matrix of the rod tensions'''
+		from scipy import sparse
+		if n is None:
+			n = int(max(self.rods.max(initial=-1), self.supports.max(initial=-1))) + 1
+		a, b = self.rods[:, 0], self.rods[:, 1]
+		return sparse.csr_matrix((np.r_[self.tension, self.tension], (np.r_[a, b], np.r_[b, a])),
+								 shape=(n, n))
+
+	def as_dict(self):
+		'''@return the solution as JSON serialisable lists and numbers'''
+		def number(v):
+			return None if v is None or not np.isfinite(v) else float(v)
+		return {"status": self.status, "objective": number(self.objective), "bound": number(self.bound),
+				"rod_cost": number(self.rod_cost), "support_cost": number(self.support_cost),
+				"rods": self.rods.tolist(), "tension": self.tension.tolist(),
+				"supports": self.supports.tolist(), "support_force": self.support_force.tolist()}
+
+	@classmethod
+	def from_dict(cls, d):
+		def number(v):
+			return None if v is None else float(v)
+		return cls(d["status"], number(d["objective"]), number(d["bound"]),
+				   np.asarray(d["rods"], dtype=np.int64).reshape(-1, 2), np.asarray(d["tension"], dtype=float),
+				   np.asarray(d["supports"], dtype=np.int64),
+				   np.asarray(d["support_force"], dtype=float).reshape(-1, 6),
+				   number(d.get("rod_cost")), number(d.get("support_cost")))
+
+	def save(self, path):
+		'''Write the solution to a .json or .npz file.'''
+		if path.endswith(".npz"):
+			scalars = {k: np.nan if v is None else v for k, v in
+					   (("objective", self.objective), ("bound", self.bound),
+						("rod_cost", self.rod_cost), ("support_cost", self.support_cost))}
+			np.savez_compressed(path, status=self.status, rods=self.rods, tension=self.tension,
+								supports=self.supports, support_force=self.support_force, **scalars)
+		else:
+			with open(path, "w") as f:
+				json.dump(self.as_dict(), f)
+
+	@classmethod
+	def load(cls, path):
+		'''@return the Solution saved to path'''
+		if not path.endswith(".npz"):
+			with open(path) as f:
+				return cls.from_dict(json.load(f))
+		with np.load(path) as data:
+			def number(k):
+				v = float(data[k])
+				return None if np.isnan(v) else v
+			return cls(str(data["status"]), number("objective"), number("bound"), data["rods"],
+					   data["tension"], data["supports"], data["support_force"],
+					   number("rod_cost"), number("support_cost"))
+
+	def summary(self, limit=10):
+		'''@return a few lines on the solution, listing at most limit rods and supports'''
+		lines = ["status %s, objective %r = rods %r + supports %r" % (
+			self.status, self.objective, self.rod_cost, self.support_cost)]
+		if self.gap is not None:
+			lines[0] += ", bound %r, gap %.3g%%" % (self.bound, 100.0*self.gap)
+		lines.append("%d rods:" % len(self.rods) + "".join(
+			" %d-%d (%.4g)" % (a, b, t) for (a, b), t in zip(self.rods[:limit].tolist(), self.tension[:limit])))
+		lines.append("%d supports:" % len(self.supports) + "".join(
+			" %d" % s for s in self.supports[:limit].tolist()))
+		if len(self.rods) > limit or len(self.supports) > limit:
+			lines.append("...")
+		return "\n".join(lines)
+
+	def __repr__(self):
+		return "Solution(status=%r, objective=%r, rods=%d, supports=%d)" % (
+			self.status, self.objective, len(self.rods), len(self.supports))
+
+
+def decode(model, x, status="optimal", objective=None, bound=None, tol=0.5):
+	'''@return the Solution of the vector x in the column order of model.Model
+	in one vectorised pass; the objective defaults to that of x'''
+	e, n = model.num_edges, model.n
+	if x is None:
+		return Solution(status, None, bound, np.empty((0, 2), dtype=np.int64), np.empty(0),
+						np.empty(0, dtype=np.int64), np.empty((0, 6)))
+	x = np.asarray(x, dtype=float)
+	rod = x[:e] > tol
+	rod_cost = -float(model.obj[:e] @ np.round(x[:e]))
+	support_cost = -float(model.obj[2*e:2*e+n] @ np.round(x[2*e:2*e+n]))
+	if not model.compact:
+		rod &= model.ea < model.eb
+	supports = np.nonzero(x[2*e:2*e+n] > tol)[0]
+	if objective is None:
+		objective = rod_cost + support_cost
+	return Solution(status, objective, bound, np.column_stack([model.ea[rod], model.eb[rod]]),
+					x[e:2*e][rod], supports, x[2*e+n:].reshape(n, 6)[supports], rod_cost, support_cost)
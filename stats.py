@@ -0,0 +1,93 @@
+'''Timings and counters of a Structure.solve.
+
+	result = struct.solve(stats=True)
+	print(result.stats)
+
+The phases are geometry (the rod candidates), assembly (the sparse
+model), setup (the intlinprog matrices), branch_and_bound, pricing (the
+rods missing from a pruned model) and decode, each with its wall and
+CPU seconds. Nothing is measured unless asked for.
+'''
+import json
+import sys
+import time
+from contextlib import contextmanager, nullcontext
+
+try:
+	import resource
+except ImportError:     # not on Windows
+	resource = None
+
+
+class SolveStats:
+	'''The wall and CPU seconds of every phase, the model and solver
+	counters, the incumbent history and the peak memory of one solve.'''
+	def __init__(self):
+		self.phases = {}      # name -> [wall, cpu] seconds, summed over repeats
+		self.counters = {}
+		self.history = []     # (seconds, objective, bound) at every new incumbent
+		self.peak_memory = None     # bytes
+		self.peak_rss = None        # bytes, of the whole process, where resource is available
+
+	@contextmanager
+	def phase(self, name):
+		'''Add the time spent in the with block to phase name.'''
+		wall, cpu = time.perf_counter(), time.process_time()
+		try:
+			yield self
+		finally:
+			t = self.phases.setdefault(name, [0.0, 0.0])
+			t[0] += time.perf_counter() - wall
+			t[1] += time.process_time() - cpu
+
+	def count(self, **counters):
+		self.counters.update(counters)
+
+	def finish(self, peak_memory=None):
+		'''Record the peak memory at the end of the solve.'''
+		self.peak_memory = peak_memory
+		if resource is not None:
+			rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+			# kilobytes on Linux, bytes on macOS
+			self.peak_rss = rss if sys.platform == "darwin" else rss * 1024
+
+	@property
+	def wall(self):
+		return sum(t[0] for t in self.phases.values())
+
+	@property
+	def cpu(self):
+		return sum(t[1] for t in self.phases.values())
+
+	def as_dict(self):
+		return {"phases": {name: {"wall": t[0], "cpu": t[1]} for name, t in self.phases.items()},
+				"counters": dict(self.counters),
+				"history": [list(h) for h in self.history],
+				"peak_memory": self.peak_memory, "peak_rss": self.peak_rss}
+
+	def __repr__(self):
+		lines = ["%-16s %9.4fs wall %9.4fs cpu" % (name, t[0], t[1]) for name, t in self.phases.items()]
+		lines += ["%-16s %s" % (name, value) for name, value in self.counters.items()]
+		if self.peak_memory is not None:
+			lines.append("%-16s %d bytes" % ("peak_memory", self.peak_memory))
+		return "\n".join(lines)
+
+
+def phase(stats, name):
+	'''@return stats.phase(name), or a no-op when stats is None'''
+	return nullcontext() if stats is None else stats.phase(name)
+
+
+class JSONLinesSink:
+	'''A sink writing every SolveStats as one JSON line to a file or path.'''
+	def __init__(self, out):
+		self.out = out
+
+	def __call__(self, stats):
+		line = json.dumps(stats.as_dict(), default=float) + "\n"
+		if isinstance(self.out, str):
+			with open(self.out, "a") as f:
+				f.write(line)
+		else:
+			self.out.write(line)
+			self.out.flush()
@@ -0,0 +1,140 @@
+'''Solve one Structure for a batch of mass vectors.
+
+The masses only enter the model through the z equilibrium right-hand
+sides and the scaled big-Ms (see model.Model.set_mass), while the
+objective only depends on the geometry. So one model is built per chunk
+of the sweep and updated in place from point to point, and the rods and
+supports of the previous point keep their cost at the next one whenever
+they can still carry the new masses. A point is certified without
+branching in two cheap ways. When its masses are a multiple s >= 1 of
+those of an optimal point, that solution with its forces scaled by s is
+kept if it still fits under the big-Ms of the new point, which it need
+not, as the big-Ms are at least m2 and do not scale with the masses. It
+is then optimal: any mobile of the new point scaled by 1/s fits under
+the big-Ms of the old one, which for both "constant" and "scaled" shrink
+by at most s, so it costs no less. Otherwise the LP with
+the previous binaries fixed gives the incumbent, and the root LP
+relaxation proves it optimal when its bound reaches it. Only the points
+where both fail are solved by branch-and-bound, with the previous
+solution as MIP start. The points of a pruned structure are checked
+against the missing rods as by Structure.solve.
+
+The chunks are solved in parallel; a chunk starts with a cold solve of
+its first point, so consecutive points, which usually differ least, are
+kept in one chunk.
+'''
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from lpsolver import IntLinProgResult, intlinprog
+
+
+def _scaled(known, mass, i, A_ub, b_ub, tol=1e-6):
+	'''@return the result of a known optimal point whose masses are a
+	multiple s >= 1 of mass, with its forces scaled by s, when these still
+	satisfy the activation rows A_ub x <= b_ub, or None'''
+	for g, result in known:
+		scale = mass.sum() / g.sum()
+		if scale >= 1.0 and np.allclose(mass, scale*g, rtol=1e-12, atol=0.0):
+			x = result.x.copy()
+			x[i:] *= scale
+			if A_ub is not None and A_ub.shape[0] and \
+			   (A_ub @ x - b_ub).max() > tol*max(1.0, float(np.abs(x[i:]).max(initial=0.0))):
+				continue
+			return IntLinProgResult(x, result.fun, "optimal", result.bound, 0, [], 0.0)
+	return None
+
+
+def _point(struct, mass, previous, known, options):
+	'''Update struct to mass and solve it. @return the result and whether
+	it was certified without branching'''
+	struct._set_mass(mass)
+	C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = struct.build_intlinprog()
+	result = _scaled(known, mass, i, A_ub, b_ub, options.get("tol", 1e-6))
+	if result is not None:
+		return result, True
+	bounds = struct.bounds()
+	# the start and the root node, the root bound certifies the start when it reaches it
+	cheap = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds, x0=previous, max_nodes=1,
+					   tol=options.get("tol", 1e-6))
+	if cheap.status in ("optimal", "infeasible"):
+		return cheap, True
+	result = intlinprog(C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i, bounds=bounds,
+						x0=previous if cheap.x is None else cheap.x, **options)
+	result.time += cheap.time
+	result.nodes += cheap.nodes
+	return result, False
+
+
+def _checked(struct, mass, previous, known, options):
+	'''_point, with the result of a pruned structure checked against the
+	rods it misses as by Structure.solve; it is only certified when it
+	stays proven'''
+	result, certified = _point(struct, mass, previous, known, options)
+	if struct.is_pruned():
+		result = struct._widen(result, None, **options)
+		certified = certified and result.status == "optimal"
+	return result, certified
+
+
+def _sweep_chunk(job):
+	cls, nodes, kwargs, points, masses, options = job
+	struct = cls(nodes, masses[0], **kwargs)
+	rows = []
+	previous = None
+	known = []      # (masses, result) of the optimal points
+	model = None
+	for point, mass in zip(points, masses):
+		if previous is None:
+			struct.mass = mass
+			result, certified = struct.solve(**options), False
+		else:
+			result, certified = _checked(struct, mass, previous, known, options)
+		if struct.model() is not model:
+			# a pruned model widened, the vectors of the old one do not fit
+			model, known, previous = struct.model(), [], None
+		if result.x is not None:
+			previous = result.x
+		if result.status == "optimal" and result.x is not None:
+			known.append((mass, result))
+		row = {"point": int(point), "mass": mass.tolist(), "certified": certified,
+			   "time": result.time, "nodes": result.nodes}
+		row.update(struct.decode(result).as_dict())
+		rows.append(row)
+	return rows
+
+
+def sweep(struct, masses, workers=1, **options):
+	'''Solve struct for every mass vector of masses, options are passed on
+	to intlinprog, and workers > 1 solves contiguous chunks of the points
+	in parallel.
+	@return one record per point, in order: point, mass, certified (solved
+	without branching), time, nodes and the Solution.as_dict() entries'''
+	masses = np.atleast_2d(np.asarray(masses, dtype=float))
+	n = len(struct.nodes)
+	if masses.shape[1] < n:
+		raise ValueError("%d balls but %d masses per point" % (n, masses.shape[1]))
+	masses = masses[:, :n]
+	kwargs = {"compact": struct.compact, "neighbours": struct.neighbours, "radius": struct.radius,
+			  "bigm": struct.bigm, "pairs": struct.pairs}
+	chunks = [idx for idx in np.array_split(np.arange(len(masses)), max(1, min(workers, len(masses)))) if len(idx)]
+	jobs = [(type(struct), struct.nodes, kwargs, idx, masses[idx], options) for idx in chunks]
+	if len(jobs) == 1:
+		parts = [_sweep_chunk(job) for job in jobs]
+	else:
+		with ProcessPoolExecutor(workers) as pool:
+			parts = list(pool.map(_sweep_chunk, jobs))
+	return [row for part in parts for row in part]
+
+
+def format_table(rows):
+	'''@return the sweep records as a text table, one line per point'''
+	lines = ["%5s %-12s %14s %5s %8s %9s %8s  %s" % ("point", "status", "objective", "rods", "supports",
+													  "certified", "seconds", "rods")]
+	for row in rows:
+		objective = "-" if row["objective"] is None else "%.6g" % row["objective"]
+		lines.append("%5d %-12s %14s %5d %8d %9s %8.3f  %s" % (
+			row["point"], row["status"], objective, len(row["rods"]), len(row["supports"]),
+			"yes" if row["certified"] else "no", row["time"], " ".join("%d-%d" % tuple(r) for r in row["rods"])))
+	return "\n".join(lines)
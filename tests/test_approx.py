@@ -0,0 +1,16 @@
+import pytest
+
+from analysis import Structure
+from bench import instance
+from verify import verify
+
+
+@pytest.mark.parametrize("rounding", ["threshold", "random"])
+def test_approx_is_a_verified_mobile_between_bound_and_optimum(rounding):
+	p, g = instance("random", 6, 0)
+	optimum = Structure(p, g, compact=True).solve().fun
+	struct = Structure(p, g, compact=True)
+	result = struct.solve_approx(rounding=rounding, trials=4, seed=0)
+	assert result.status == "approximate"
+	assert result.bound <= optimum + 1e-6*abs(optimum) <= result.fun + 2e-6*abs(optimum)
+	assert verify(struct, struct.decode(result)).passed
@@ -0,0 +1,43 @@
+import asyncio
+import time
+
+from analysis import Structure
+from bench import instance
+
+
+def test_incumbents_end_with_the_final_solution():
+	p, g = instance("random", 6, 0)
+	struct = Structure(p, g, compact=True)
+
+	async def collect():
+		return [solution async for solution in struct.incumbents()]
+	solutions = asyncio.run(collect())
+	assert solutions[-1].status == "optimal"
+	assert all(s.status == "incumbent" for s in solutions[:-1])
+	assert [s.objective for s in solutions[:-1]] == sorted((s.objective for s in solutions[:-1]), reverse=True)
+
+
+def test_time_limit_and_cancel_stop_the_search():
+	p, g = instance("random", 40, 0)
+
+	async def limited():
+		return await Structure(p, g, compact=True).solve_async(time_limit=1)
+	start = time.perf_counter()
+	assert asyncio.run(limited()).status == "time_limit"
+	assert time.perf_counter() - start < 5
+
+	struct = Structure(p, g, compact=True)
+	async def cancelled():
+		task = asyncio.ensure_future(struct.solve_async())
+		await asyncio.sleep(0.5)
+		task.cancel()
+		try:
+			await task
+		except asyncio.CancelledError:
+			return True
+	assert asyncio.run(cancelled())
+	# the worker thread stops at the next node and records its result
+	deadline = time.perf_counter() + 5
+	while struct._result is None and time.perf_counter() < deadline:
+		time.sleep(0.05)
+	assert struct._result.status == "cancelled"
@@ -0,0 +1,51 @@
+import threading
+
+import numpy as np
+import pytest
+
+import backends
+from analysis import Structure
+from bench import instance
+from verify import verify
+
+
+def _records(name, times):
+	return [{"backend": name, "columns": 10*k, "integers": k, "status": "optimal", "time": t}
+			for k, t in times]
+
+
+def test_select_without_calibration():
+	assert backends.select(100, 10, records=[], names=["native", "scipy"]) == "native"
+	assert backends.select(5000, 10, records=[], names=["native", "scipy"]) == "scipy"
+	assert backends.select(5000, 1000, records=[], names=["native"]) == "native"
+
+
+def test_select_by_calibration():
+	records = _records("native", [(10, 0.01), (100, 1.0), (1000, 100.0)]) + \
+		_records("scipy", [(10, 0.1), (100, 0.2), (1000, 0.4)])
+	assert backends.select(50, 5, records=records, names=["native", "scipy"]) == "native"
+	assert backends.select(5000, 500, records=records, names=["native", "scipy"]) == "scipy"
+	assert backends.predict(_records("scipy", [(10, 2.0)]), "scipy", 1000, 100) == pytest.approx(2.0)
+
+
+def test_backend_is_abstract():
+	with pytest.raises(TypeError):
+		backends.Backend()
+
+
+def test_native_only_options_on_other_backends():
+	struct = Structure(*instance("random", 4, 0), compact=True)
+	with pytest.raises(ValueError):
+		struct.solve(backend="scipy", stop=threading.Event())
+	with pytest.warns(RuntimeWarning):
+		struct.solve(backend="scipy", x0=np.zeros(len(struct.unknown())))
+	assert struct.solve(backend="auto", stop=threading.Event()).backend == "native"
+
+
+def test_scipy_mobiles_hold():
+	p, g = instance("random", 30, 0)
+	idx = [8, 12, 25, 27]
+	struct = Structure(p[idx], g[idx], compact=True)
+	result = struct.solve(backend="scipy")
+	assert verify(struct, result).passed
+	assert result.fun == pytest.approx(struct.solve().fun, rel=1e-6)
@@ -0,0 +1,23 @@
+import json
+
+from batch import main, read_instances
+from bench import instance
+
+
+def test_batch_solves_and_reports_every_line(tmp_path):
+	p, g = instance("random", 4, 0)
+	lines = [json.dumps({"id": "a", "nodes": p.tolist(), "mass": g.tolist()}),
+			 "not json",
+			 json.dumps({"id": "b", "nodes": p.tolist(), "mass": g[:3].tolist()}),
+			 json.dumps({"nodes": p[:3].tolist(), "mass": g[:3].tolist()})]
+	path = tmp_path / "instances.jsonl"
+	path.write_text("\n".join(lines) + "\n")
+	assert len(list(read_instances(str(path)))) == 4
+	out = tmp_path / "results.jsonl"
+	main([str(path), "-o", str(out), "-j", "2", "--compact"])
+	records = {r["id"]: r for r in map(json.loads, out.read_text().splitlines())}
+	assert set(records) == {"a", 1, "b", 3}
+	assert records["a"]["status"] == records[3]["status"] == "optimal"
+	assert records["a"]["verified"] and records[3]["verified"]
+	assert records[1]["status"] == records["b"]["status"] == "error"
+	assert "3 masses" in records["b"]["error"]
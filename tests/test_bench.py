@@ -0,0 +1,21 @@
+import json
+
+import pytest
+
+from bench import main, run
+
+
+@pytest.mark.parametrize("backend", ["native", "scipy"])
+def test_run_solves_with_the_backend(backend):
+	record = run("random", 5, backend=backend, memory=False, compact=True)
+	assert record["backend"] == backend and record["status"] == "optimal"
+	assert "solve_peak" not in record and record["integers"] == 15
+
+
+def test_main_appends_one_record_per_instance(tmp_path):
+	out = tmp_path / "bench.jsonl"
+	main(["--kinds", "random", "grid", "--sizes", "4", "12", "--solve-max", "4", "--backend", "auto",
+		  "-o", str(out)])
+	records = [json.loads(line) for line in out.read_text().splitlines()]
+	assert [(r["kind"], r["n"]) for r in records] == [("random", 4), ("random", 12), ("grid", 4), ("grid", 12)]
+	assert [("status" in r) for r in records] == [True, False, True, False]
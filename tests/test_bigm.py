@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from model import build_model
+
+
+# the middle ball hangs from two nearly flat rods of tension 50 each
+FLAT = [(0.0, 0.0, 0.0), (1.0, 0.0, 0.01), (-1.0, 0.0, 0.01)]
+
+
+@pytest.mark.parametrize("compact", [False, True])
+def test_scaled_keeps_the_optimum_of_constant(compact):
+	constant = Structure(FLAT, [1.0, 1.0, 1.0], compact=compact, bigm="constant").solve()
+	scaled = Structure(FLAT, [1.0, 1.0, 1.0], compact=compact, bigm="scaled").solve()
+	assert constant.status == scaled.status == "optimal"
+	assert constant.fun == pytest.approx(22.0006, abs=1e-4)
+	assert scaled.fun == pytest.approx(constant.fun)
+
+
+def test_scaled_is_never_below_m2():
+	p = np.array(FLAT)
+	model = build_model(p[:, 0], p[:, 1], p[:, 2], [1e-3]*3, bigm="scaled")
+	assert (model.m_rod >= 8888).all() and (model.m_ext >= 8888).all()
+
+
+def test_scaled_holds_masses_too_heavy_for_m2():
+	p = np.array(FLAT)
+	heavy = [1e4, 1e4, 1e4]
+	# not even a support of its own holds a ball under m2
+	assert Structure(p, heavy, compact=True, bigm="constant").solve().status == "infeasible"
+	assert Structure(p, heavy, compact=True, bigm="scaled").solve().fun == pytest.approx(22.0006, abs=1e-4)
+
+
+def test_set_mass_from_zero_masses_rebuilds_the_bigm():
+	rng = np.random.default_rng(1)
+	p, g = rng.normal(size=(6, 3)), rng.uniform(1.0, 2.0, 6)
+	for compact in (False, True):
+		model = build_model(p[:, 0], p[:, 1], p[:, 2], np.zeros(6), compact=compact, bigm="scaled")
+		model.set_mass(g)
+		fresh = build_model(p[:, 0], p[:, 1], p[:, 2], g, compact=compact, bigm="scaled")
+		np.testing.assert_allclose(model.vals, fresh.vals)
+		np.testing.assert_allclose(model.rhs, fresh.rhs)
+
+
+def test_unknown_bigm_is_rejected():
+	with pytest.raises(ValueError):
+		Structure(FLAT, [1.0, 1.0, 1.0], bigm="tight").model()
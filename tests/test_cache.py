@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from cache import SolveCache
+from verify import verify
+
+
+def test_translated_and_renumbered_copies_hit(tmp_path):
+	p, g = instance("random", 5, 0)
+	cache = SolveCache(maxsize=1, path=str(tmp_path))
+	first = cache.solve(Structure(p, g, compact=True))
+	perm = np.array([3, 0, 4, 1, 2])
+	copy = Structure(p[perm] + [1.0, -2.0, 0.5], g[perm], compact=True)
+	second = cache.solve(copy)
+	assert cache.stats()["hits"] == 1
+	assert second.objective == pytest.approx(first.objective)
+	assert verify(copy, second).passed
+	cache.solve(Structure(p[:4], g[:4], compact=True))
+	assert cache.stats()["evictions"] == 1
+	# a fresh cache reads the solution back from the directory
+	again = SolveCache(path=str(tmp_path)).get(copy)
+	assert again is not None and again.status == "optimal"
+	np.testing.assert_array_equal(again.rods, second.rods)
+	np.testing.assert_allclose(again.tension, second.tension)
+	assert sorted(f.suffix for f in tmp_path.iterdir()) == [".npz", ".npz"]
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from colgen import column_generation, fill
+from verify import verify
+
+
+def test_colgen_finds_the_full_optimum_of_a_small_mobile():
+	p, g = instance("random", 6, 0)
+	full = Structure(p, g, compact=True, bigm="scaled").solve()
+	struct = Structure(p, g, compact=True, bigm="scaled")
+	solution = struct.solve_colgen()
+	assert solution.bound <= full.fun + 1e-6*abs(full.fun)
+	assert solution.objective == pytest.approx(full.fun, rel=1e-6)
+	assert verify(struct, solution).passed
+
+
+def test_colgen_caps_the_columns():
+	p, g = instance("random", 150, 0)
+	struct = Structure(p, g, compact=True, bigm="scaled")
+	for cap in (None, 300):
+		master, _, _ = column_generation(struct, max_columns=cap)
+		assert len(master.model().ea) <= (8*150 if cap is None else cap)
+
+
+def test_fill_skips_the_edges():
+	p, _ = instance("random", 10, 0)
+	y = np.random.default_rng(0).normal(size=(10, 3))
+	ea, eb = np.array([0, 1]), np.array([1, 2])
+	a, b = fill(p, y, 1.0, ea, eb, 5, chunk=3)
+	assert len(a) == 5 and (a < b).all()
+	assert not {(0, 1), (1, 2)} & set(zip(a.tolist(), b.tolist()))
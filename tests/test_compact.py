@@ -0,0 +1,15 @@
+import pytest
+
+from analysis import Structure
+from bench import instance
+from verify import verify
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_compact_and_directed_agree(seed):
+	p, g = instance("random", 5, seed)
+	directed = Structure(p, g).solve()
+	compact = Structure(p, g, compact=True).solve()
+	assert directed.status == compact.status == "optimal"
+	assert compact.fun == pytest.approx(directed.fun, rel=1e-6)
+	assert verify(Structure(p, g), Structure(p, g, compact=True).decode(compact)).passed
@@ -0,0 +1,22 @@
+import numpy as np
+
+from analysis import Structure
+from decompose import solve_clusters, worst_status
+
+
+def test_worst_status_ranks_every_status():
+	assert worst_status(["optimal", "approximate", "local"]) == "local"
+	assert worst_status(["optimal", "gap_limit", "node_limit"]) == "node_limit"
+	assert worst_status(["time_limit", "cancelled"]) == "cancelled"
+	assert worst_status(["optimal", "infeasible", "unbounded"]) == "infeasible"
+	# an unknown status is never taken for a success
+	assert worst_status(["optimal", "mystery"]) == "mystery"
+
+
+def test_groups_merge_to_approximate():
+	p = np.array([(0.0, 0.0, 0.0), (0.3, 0.0, -0.5), (100.0, 0.0, 0.0), (100.3, 0.0, -0.5)])
+	struct = Structure(p, [1.0, 1.0, 1.0, 1.0], compact=True)
+	for options in ({}, {"mip_gap": 0.5}):
+		solution = solve_clusters(struct, threshold=1.0, **options)
+		assert solution.status in ("approximate", "gap_limit")
+		assert solution.objective is not None and solution.bound is None
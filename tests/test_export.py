@@ -0,0 +1,62 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from export import _name, write_lp, write_mps
+
+highspy = pytest.importorskip("highspy")
+from scipy.sparse import csc_matrix
+
+
+def _read(path):
+	h = highspy.Highs()
+	h.setOptionValue("output_flag", False)
+	assert h.readModel(str(path)) == highspy.HighsStatus.kOk
+	return h
+
+
+@pytest.mark.parametrize("options", [{}, {"compact": True}, {"compact": True, "neighbours": 2},
+									 {"bigm": "scaled"}])
+@pytest.mark.parametrize("suffix", [".lp", ".mps", ".mps.gz"])
+def test_round_trip(tmp_path, options, suffix):
+	rng = np.random.default_rng(0)
+	p, g = rng.normal(size=(5, 3)), rng.uniform(1.0, 2.0, 5)
+	p[4] = p[3]
+	struct = Structure(p, g, **options)
+	path = tmp_path / ("mobile" + suffix)
+	(write_lp if suffix == ".lp" else write_mps)(struct, str(path))
+	if suffix.endswith(".gz"):
+		import gzip
+		path.with_suffix("").write_bytes(gzip.open(str(path)).read())
+		path = path.with_suffix("")
+	assert "nan" not in path.read_text()
+	h = _read(path)
+	lp = h.getLp()
+	model = struct.model()
+	col = {name: k for k, name in enumerate(lp.col_names_)}
+	row = {name: k for k, name in enumerate(lp.row_names_)}
+	cols = [col[_name(model.colname(k))] for k in range(model.num_cols)]
+	rows = [row[_name(model.rowname(r))] for r in range(model.num_rows)]
+	A = csc_matrix((lp.a_matrix_.value_, lp.a_matrix_.index_, lp.a_matrix_.start_),
+				   shape=(lp.num_row_, lp.num_col_)).toarray()[np.ix_(rows, cols)]
+	np.testing.assert_allclose(A, model.tocsr().toarray())
+	np.testing.assert_allclose(np.asarray(lp.col_cost_)[cols], model.obj)
+	h.run()
+	assert h.getInfo().objective_function_value == pytest.approx(-struct.solve().fun, rel=1e-6)
+
+
+def test_indicators_only_in_lp(tmp_path):
+	struct = Structure([(0.0, 0.0, 0.0), (1.0, 0.0, -1.0)], [1.0, 1.0], compact=True, bigm="indicator")
+	write_lp(struct, str(tmp_path / "mobile.lp"))
+	assert "->" in (tmp_path / "mobile.lp").read_text()
+	with pytest.raises(ValueError):
+		write_mps(struct, str(tmp_path / "mobile.mps"))
+
+
+@pytest.mark.parametrize("write", [write_lp, write_mps])
+def test_chunks_do_not_change_the_file(tmp_path, write):
+	rng = np.random.default_rng(1)
+	struct = Structure(rng.normal(size=(6, 3)), rng.uniform(1.0, 2.0, 6))
+	write(struct, str(tmp_path / "small"), chunk=7)
+	write(struct, str(tmp_path / "large"))
+	assert (tmp_path / "small").read_text() == (tmp_path / "large").read_text()
@@ -0,0 +1,24 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.mark.parametrize("module", ["analysis", "batch", "verify", "cache", "revision2", "mipex1"])
+def test_import_defers_the_solvers(module):
+	code = ("import sys, %s\n"
+			"print(' '.join(m for m in ('scipy', 'cplex', 'highspy') if m in sys.modules))" % module)
+	out = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=True)
+	assert out.stdout.split() == []
+
+
+def test_structure_builds_its_model_on_first_use():
+	from analysis import Structure
+	from bench import instance
+	struct = Structure(*instance("random", 4, 0))
+	assert struct._model is None
+	struct.model()
+	assert struct._model is not None
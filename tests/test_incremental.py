@@ -0,0 +1,22 @@
+import pytest
+
+from analysis import Structure
+from bench import instance
+
+
+def test_add_node_offers_rods_with_explicit_pairs():
+	p, g = instance("random", 6, 0)
+	struct = Structure(p[:5], g[:5], compact=True, pairs=([0, 1, 2, 3], [1, 2, 3, 4]))
+	struct.solve()
+	struct.add_node(p[5], g[5], neighbourhood=2)
+	a, b = struct.pairs
+	assert (b == 5).sum() == 2 and (a < b).all()
+
+
+def test_remove_node_matches_a_fresh_solve():
+	p = [(0.0, 0.0, 0.0), (0.0, 0.0, -1.0), (5.0, 0.0, -2.0), (5.0, 0.0, -3.0)]
+	struct = Structure(p, [1.0]*4, compact=True)
+	struct.solve()
+	result = struct.remove_node(0, neighbourhood=1)
+	assert result.status == "local"
+	assert result.fun == pytest.approx(Structure(p[1:], [1.0]*3, compact=True).solve().fun)
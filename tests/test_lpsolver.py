@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from lpsolver import intlinprog
+from verify import verify
+
+
+def test_knapsack():
+	# max 5 a + 4 b + 3 c with 2 a + 3 b + c <= 5
+	result = intlinprog([-5.0, -4.0, -3.0], np.array([[2.0, 3.0, 1.0]]), [5.0], None, None, None, None, 3,
+						bounds=(np.zeros(3), np.ones(3)))
+	assert result.status == "optimal"
+	assert result.fun == pytest.approx(-9.0)
+	np.testing.assert_allclose(result.x, [1.0, 1.0, 0.0])
+
+
+def test_binaries_near_zero_carry_no_force():
+	# with big-M 8888 a binary at 1e-7 holds a force of 1e-3 in the relaxation
+	p, g = instance("random", 30, 0)
+	idx = [8, 12, 25, 27]
+	struct = Structure(p[idx], g[idx], compact=True)
+	result = struct.solve()
+	assert verify(struct, result).passed
+	assert result.fun == pytest.approx(struct.solve(tol=1e-9).fun, rel=1e-9)
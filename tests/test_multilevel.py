@@ -0,0 +1,29 @@
+import time
+
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from multilevel import coarsen
+from verify import verify
+
+
+def test_coarsen_keeps_the_mass_and_bounds_the_clusters():
+	p, g = instance("clustered", 200, 0)
+	labels, centres, weight = coarsen(p, g, ratio=8)
+	assert np.bincount(labels).max() <= 16
+	assert weight.sum() == pytest.approx(np.sum(g))
+	np.testing.assert_allclose(centres[0], (p[labels == 0]*g[labels == 0, None]).sum(axis=0) / weight[0])
+
+
+def test_multilevel_mobile_verifies_within_its_budget():
+	p, g = instance("random", 120, 0)
+	struct = Structure(p, g, compact=True, neighbours=4)
+	for budget in (10, 0.5):
+		start = time.perf_counter()
+		solution = struct.solve_multilevel(coarse_size=8, ratio=4, time_limit=budget)
+		assert time.perf_counter() - start < budget + 5
+		assert solution.status in ("approximate", "time_limit")
+		assert solution.bound <= solution.objective
+		assert verify(struct, solution).passed
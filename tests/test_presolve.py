@@ -0,0 +1,38 @@
+import pytest
+
+from analysis import Structure
+from verify import verify
+
+CASES = {
+	"coinciding": ([(0, 0, 0), (0, 0, 0), (1, 0, 1), (2, 0, 0)], [1, 2, 1, 1]),
+	"nearly coinciding": ([(0, 0, 0), (1e-9, 0, 0), (1, 0, 1), (2, 0, 0)], [1, 2, 1, 1]),
+	"all in one point": ([(1, 1, 1)]*3, [1, 1, 1]),
+	"one ball": ([(0, 0, 0)], [1]),
+	"vertical line": ([(0, 0, 0), (0, 0, 1), (0, 0, 2), (0, 0, 3)], [1, 1, 1, 1]),
+	"slanted line": ([(0, 0, 0), (1, 0, 1), (2, 0, 2), (3, 0, 3)], [1, 1, 1, 1]),
+	"horizontal line": ([(0, 0, 0), (1, 0, 0), (2, 0, 0)], [1, 1, 1]),
+	"horizontal plane": ([(0, 0, 0), (1, 0, 0), (0, 1, 0), (1, 1, 0)], [1, 1, 1, 0]),
+	"no mass": ([(0, 0, 0), (1, 0, 1), (2, 0, 0)], [0, 0, 0]),
+}
+
+
+@pytest.mark.parametrize("name", sorted(CASES))
+@pytest.mark.parametrize("coincident", ["merge", "fix"])
+@pytest.mark.parametrize("options", [{}, {"compact": True}, {"compact": True, "neighbours": 1}])
+def test_presolved_mobile_holds_the_original_balls(name, coincident, options):
+	p, g = CASES[name]
+	solution = Structure(p, g, **options).presolve(coincident=coincident).solve()
+	full = Structure(p, g, **options).solve()
+	assert verify(Structure(p, g), solution).passed
+	if solution.status == "optimal":
+		assert solution.objective == pytest.approx(full.fun, rel=1e-6)
+	if solution.bound is not None:
+		assert solution.bound <= full.fun + 1e-6*abs(full.fun)
+
+
+def test_near_coincidence_is_not_proven():
+	p, g = CASES["nearly coinciding"]
+	presolved = Structure(p, g, compact=True).presolve()
+	assert not presolved.report.exact
+	solution = presolved.solve()
+	assert solution.status != "optimal" and solution.bound is None
@@ -0,0 +1,38 @@
+import time
+
+import pytest
+
+from analysis import Structure
+from bench import instance
+from candidates import candidate_pairs
+
+
+@pytest.mark.parametrize("kind, seed", [("random", 0), ("random", 3), ("clustered", 1)])
+def test_pruned_is_never_optimal_above_the_full_optimum(kind, seed):
+	p, g = instance(kind, 6, seed)
+	full = Structure(p, g, compact=True).solve()
+	for neighbours in (1, 2):
+		pruned = Structure(p, g, compact=True, neighbours=neighbours).solve()
+		assert pruned.bound <= full.fun + 1e-6*abs(full.fun)
+		if pruned.status == "optimal":
+			assert pruned.fun == pytest.approx(full.fun, rel=1e-6)
+		else:
+			assert pruned.fun >= full.fun - 1e-6*abs(full.fun)
+
+
+def test_candidates_are_symmetric_and_sorted():
+	p, _ = instance("random", 20, 0)
+	a, b = candidate_pairs(p, 3)
+	assert (a < b).all()
+	assert len(set(zip(a.tolist(), b.tolist()))) == len(a)
+	assert len(a) < 20*19//2
+
+
+def test_feasible_pruned_models_are_not_widened():
+	p, g = instance("random", 40, 0)
+	struct = Structure(p, g, compact=True, neighbours=3)
+	start = time.perf_counter()
+	result = struct.solve(time_limit=1.0)
+	assert time.perf_counter() - start < 3.0
+	assert struct.model().num_edges == len(candidate_pairs(p, 3)[0])
+	assert result.status != "optimal"
@@ -0,0 +1,26 @@
+import pytest
+
+from analysis import Structure
+from bench import instance
+
+
+def test_resolve_updates_the_masses_in_place():
+	p, g = instance("random", 5, 2)
+	struct = Structure(p, g, compact=True, bigm="scaled")
+	struct.solve()
+	model = struct.model()
+	result = struct.resolve(0.5*g)
+	assert struct.model() is model
+	assert result.fun == pytest.approx(Structure(p, 0.5*g, compact=True, bigm="scaled").solve().fun)
+
+
+def test_resolve_of_a_pruned_model_is_not_optimal_above_the_optimum():
+	p, g = instance("random", 6, 0)
+	mass = 1.7*g
+	mass[0] *= 0.3
+	struct = Structure(p, g, neighbours=2)
+	struct.solve()
+	result = struct.resolve(mass)
+	full = Structure(p, mass).solve()
+	assert result.bound <= full.fun + 1e-6*full.fun
+	assert result.status != "optimal" or result.fun == pytest.approx(full.fun, rel=1e-6)
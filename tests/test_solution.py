@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from solution import Solution
+
+
+@pytest.mark.parametrize("suffix", [".json", ".npz"])
+def test_save_and_load_round_trip(tmp_path, suffix):
+	p, g = instance("random", 6, 0)
+	struct = Structure(p, g, compact=True)
+	solution = struct.decode(struct.solve())
+	solution.bound = None
+	path = str(tmp_path / ("mobile" + suffix))
+	solution.save(path)
+	loaded = Solution.load(path)
+	assert (loaded.status, loaded.objective, loaded.bound) == ("optimal", solution.objective, None)
+	assert loaded.rod_cost + loaded.support_cost == pytest.approx(loaded.objective)
+	np.testing.assert_array_equal(loaded.rods, solution.rods)
+	np.testing.assert_array_equal(loaded.supports, solution.supports)
+	np.testing.assert_allclose(loaded.tension, solution.tension)
+	np.testing.assert_allclose(loaded.support_force, solution.support_force)
+
+
+def test_directed_and_compact_decode_alike():
+	p, g = instance("random", 5, 1)
+	directed, compact = Structure(p, g), Structure(p, g, compact=True)
+	a, b = directed.decode(directed.solve()), compact.decode(compact.solve())
+	np.testing.assert_array_equal(a.rods, b.rods)
+	np.testing.assert_array_equal(a.supports, b.supports)
+	assert (a.rods[:, 0] < a.rods[:, 1]).all()
+	assert a.adjacency(5).shape == (5, 5)
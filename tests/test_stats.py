@@ -0,0 +1,25 @@
+import io
+import json
+
+from analysis import Structure
+from bench import instance
+from stats import JSONLinesSink
+
+
+def test_stats_time_every_phase_and_reach_the_sink():
+	p, g = instance("random", 6, 0)
+	out = io.StringIO()
+	result = Structure(p, g, compact=True, neighbours=2).solve(sink=JSONLinesSink(out), trace_memory=True)
+	stats = result.stats
+	for name in ("geometry", "assembly", "setup", "branch_and_bound", "pricing", "decode"):
+		assert stats.phases[name][0] >= 0.0
+	assert stats.counters["balls"] == 6 and stats.counters["status"] == result.status
+	assert stats.peak_memory > 0
+	record = json.loads(out.getvalue())
+	assert set(record["phases"]) == set(stats.phases)
+	assert record["counters"]["nodes"] == result.nodes
+
+
+def test_no_stats_unless_asked():
+	p, g = instance("random", 4, 0)
+	assert Structure(p, g, compact=True).solve().stats is None
@@ -0,0 +1,26 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+
+
+def test_setting_the_mass_drops_the_model():
+	p, g = instance("random", 5, 0)
+	struct = Structure(p, g, compact=True)
+	struct.solve()
+	struct.mass = 3.0*g
+	np.testing.assert_allclose(struct.model().rhs[2:15:3], 3.0*g)
+	assert struct.solve().fun == pytest.approx(Structure(p, 3.0*g, compact=True).solve().fun)
+
+
+def test_setting_an_option_drops_the_model():
+	p, g = instance("random", 5, 1)
+	struct = Structure(p, g)
+	struct.solve()
+	struct.compact = True
+	assert struct.model().compact
+	struct.neighbours = 2
+	assert struct.model().num_edges < 5*4//2
+	struct.neighbours = None
+	assert struct.solve().fun == pytest.approx(Structure(p, g, compact=True).solve().fun)
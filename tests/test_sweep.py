@@ -0,0 +1,27 @@
+import pytest
+
+from analysis import Structure
+from bench import instance
+from sweep import format_table
+
+
+@pytest.mark.parametrize("bigm", ["constant", "scaled"])
+def test_sweep_matches_fresh_solves(bigm):
+	p, g = instance("random", 6, 2)
+	masses = [g, 3.0*g, 0.5*g, 2000.0*g]
+	for mass, row in zip(masses, Structure(p, g, bigm=bigm).sweep(masses)):
+		fresh = Structure(p, mass, bigm=bigm).solve()
+		assert row["status"] == fresh.status
+		assert row["objective"] == pytest.approx(fresh.fun, rel=1e-6)
+
+
+def test_sweep_of_a_pruned_model_is_not_optimal_above_the_optimum():
+	p, g = instance("random", 6, 0)
+	masses = [g, 1.7*g, 3.4*g]
+	rows = Structure(p, g, neighbours=2).sweep(masses)
+	for mass, row in zip(masses, rows):
+		full = Structure(p, mass).solve()
+		assert row["bound"] <= full.fun + 1e-6*full.fun
+		if row["status"] == "optimal" or row["certified"]:
+			assert row["objective"] == pytest.approx(full.fun, rel=1e-6)
+	assert len(format_table(rows).splitlines()) == 4
@@ -0,0 +1,27 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import model
+from model import clear_templates, template
+
+
+def test_templates_are_shared_and_the_oldest_evicted(monkeypatch):
+	clear_templates()
+	first = template(6, compact=True)
+	assert template(6, compact=True) is first
+	monkeypatch.setattr(model, "TEMPLATE_CACHE_BYTES", first.nbytes + template(5, compact=True).nbytes)
+	template(6, compact=True)        # now the most recently used
+	template(4, compact=True)
+	assert set(k[0] for k in model._TEMPLATES) == {6, 4}
+	# larger than the whole cache, built but not kept
+	assert template(30) is not template(30)
+	clear_templates()
+	assert not model._TEMPLATES
+	assert template(6, compact=True) is not first
+
+
+def test_threads_share_one_template():
+	clear_templates()
+	with ThreadPoolExecutor(8) as pool:
+		made = list(pool.map(lambda _: template(40), range(32)))
+	assert all(t is made[0] for t in made)
+	assert len(model._TEMPLATES) == 1
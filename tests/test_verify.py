@@ -0,0 +1,39 @@
+import numpy as np
+import pytest
+
+from analysis import Structure
+from bench import instance
+from solution import Solution
+from verify import verify
+
+
+@pytest.fixture
+def solved():
+	p, g = instance("random", 6, 0)
+	struct = Structure(p, g)
+	result = struct.solve()
+	return struct, result, struct.decode(result)
+
+
+def test_solver_output_passes(solved):
+	struct, result, solution = solved
+	assert verify(struct, solution).passed
+	assert verify(struct, result).passed
+	assert verify(struct, result.x).max_violation <= 1e-6
+
+
+def test_violations_are_found_and_named(solved):
+	struct, result, solution = solved
+	broken = Solution(solution.status, solution.objective + 1.0, None, solution.rods,
+					  solution.tension * 1.5, solution.supports, solution.support_force)
+	report = verify(struct, broken)
+	assert not report.passed
+	assert report.violations["objective"] > 1e-6 and report.violations["equilibrium"] > 1e-6
+	assert any(w[1].startswith("ball ") for w in report.worst)
+	x = result.x.copy()
+	x[0] = 0.5
+	report = verify(struct, x)
+	assert report.violations["integrality"] == pytest.approx(0.5)
+	with pytest.raises(ValueError):
+		verify(struct, Solution("optimal", None, None, np.array([[0, 9]]), np.ones(1),
+								np.empty(0, dtype=np.int64), np.empty((0, 6))))
@@ -0,0 +1,183 @@
+'''Check solved mobiles.
+
+	python verify.py instances.jsonl results.jsonl
+
+A decoded Solution is checked against the geometry alone: the x, y and z
+force residual of every ball under its mass, the rod tensions and the
+forces of its supports, the signs of these forces and the objective
+recomputed from the rods and supports. A raw intlinprog result, a vector
+in the column order of the Structure, is checked against its model with
+sparse products: the equilibrium rows, the f(i)-x(i) activation rows,
+the symmetry rows of the directed layout, the integrality of the
+binaries and the bounds, with the 1.1/-0.1 bounds of the binaries read
+as 0 and 1.
+
+Force residuals are measured relative to the largest mass or force of
+the solution, so that tol means the same for any unit of mass and
+matches the relative feasibility tolerances of the LP solvers.
+'''
+from __future__ import print_function
+
+import argparse
+import json
+import sys
+
+import numpy as np
+
+from lpsolver import IntLinProgResult
+from model import _len_sum
+from solution import Solution
+
+
+class Verification:
+	'''The largest violation of every kind of check, the worst offenders as
+	(kind, what, violation) and whether all of them are within tol.
+	residual is the (n, 3) force residual of every ball.'''
+	def __init__(self, passed, tol, violations, worst, residual):
+		self.passed = passed
+		self.tol = tol
+		self.violations = violations      # {kind: largest violation}
+		self.worst = worst
+		self.residual = residual
+
+	@property
+	def max_violation(self):
+		return max(self.violations.values()) if self.violations else 0.0
+
+	def as_dict(self):
+		return {"passed": self.passed, "tol": self.tol, "violations": self.violations,
+				"worst": [list(w) for w in self.worst]}
+
+	def __repr__(self):
+		return "Verification(passed=%r, %s)" % (self.passed, ", ".join(
+			"%s=%.3g" % item for item in sorted(self.violations.items())))
+
+
+def _residual(p, g, a, b, tension, supports, support_force):
+	'''@return the (n, 3) sum of the forces on every ball minus its weight'''
+	n = len(p)
+	d = p[a] - p[b]
+	length = np.sqrt((d*d).sum(axis=1))
+	with np.errstate(divide="ignore", invalid="ignore"):
+		pull = np.nan_to_num(d / length[:, np.newaxis]) * tension[:, np.newaxis]
+	net = support_force[:, 0::2] - support_force[:, 1::2]
+	residual = np.zeros((n, 3))
+	residual[:, 2] = -g
+	# a rod pulls b towards a and a towards b
+	for k in range(3):
+		residual[:, k] += (np.bincount(b, weights=pull[:, k], minlength=n) -
+						   np.bincount(a, weights=pull[:, k], minlength=n) +
+						   np.bincount(supports, weights=net[:, k], minlength=n))
+	return residual
+
+
+def _verify_solution(struct, solution):
+	p = np.asarray(struct.nodes, dtype=float).reshape(-1, 3)
+	n = len(p)
+	g = np.asarray(struct.mass, dtype=float)[:n]
+	rods = np.asarray(solution.rods, dtype=np.int64).reshape(-1, 2)
+	supports = np.asarray(solution.supports, dtype=np.int64)
+	if (rods < 0).any() or (rods >= n).any() or (supports < 0).any() or (supports >= n).any():
+		raise ValueError("the solution names balls outside of 0 to %d" % (n - 1))
+	tension = np.asarray(solution.tension, dtype=float)
+	support_force = np.asarray(solution.support_force, dtype=float).reshape(-1, 6)
+	residual = _residual(p, g, rods[:, 0], rods[:, 1], tension, supports, support_force)
+	scale = max(1.0, float(np.abs(g).max(initial=0.0)), float(np.abs(tension).max(initial=0.0)),
+				float(np.abs(support_force).max(initial=0.0)))
+
+	checks = {"equilibrium": (np.abs(residual).ravel() / scale,
+							  lambda k: "ball %d %s" % (k // 3, "xyz"[k % 3])),
+			  "sign": (np.r_[-tension, -support_force.ravel()] / scale,
+					   lambda k: ("rod %d-%d" % tuple(rods[k]) if k < len(rods) else
+								  "support %d" % supports[(k - len(rods)) // 6]))}
+	# a rod or support is used once, and a rod joins two balls
+	unique = np.unique(np.sort(rods, axis=1), axis=0)
+	checks["duplicate"] = (np.r_[float(len(rods) - len(unique)), float(len(supports) - len(np.unique(supports))),
+								 float((rods[:, 0] == rods[:, 1]).sum())],
+						   lambda k: ("repeated rods", "repeated supports", "rods from a ball to itself")[k])
+	if solution.objective is not None:
+		length = np.sqrt(((p[rods[:, 0]] - p[rods[:, 1]])**2).sum(axis=1))
+		# the objective of revision2 weighs every rod twice, see model.build_model
+		objective = 2.0*length.sum() + (_len_sum(p) + 1.0)*len(supports)
+		checks["objective"] = (np.array([abs(objective - solution.objective) / max(1.0, abs(objective))]),
+							   lambda k: "objective %r of %r" % (solution.objective, objective))
+	return checks, residual
+
+
+def _verify_vector(struct, x):
+	C, A_ub, b_ub, A_lb, b_lb, A_eq, b_eq, i = struct.build_intlinprog()
+	lb, ub = struct.bounds()
+	n = len(struct.nodes)
+	x = np.asarray(x, dtype=float)
+	# the equilibrium rows come first, then the symmetry rows of the directed layout
+	r = A_eq @ x - b_eq
+	scale = max(1.0, float(np.abs(b_eq[2:3*n:3]).max(initial=0.0)), float(np.abs(x[i:]).max(initial=0.0)))
+	# the binaries are bounded by -0.1 and 1.1 (0.1 for x(a,a)) to be solver friendly
+	lb, ub = lb.copy(), ub.copy()
+	lb[:i], ub[:i] = np.ceil(lb[:i]), np.floor(ub[:i])
+	names = []
+
+	def column(k):
+		if not names:
+			names.extend(struct.unknown())
+		return names[k]
+	checks = {"equilibrium": (np.abs(r[:3*n]) / scale, lambda k: "ball %d %s" % (k // 3, "xyz"[k % 3])),
+			  "activation": ((A_ub @ x - b_ub) / scale, lambda k: "activation row %d" % k),
+			  "symmetry": (np.abs(r[3*n:]), lambda k: "symmetry row %d" % k),
+			  "integrality": (np.abs(x[:i] - np.round(x[:i])), column),
+			  "bounds": (np.fmax(lb - x, x - ub), column)}
+	if A_lb is not None and A_lb.shape[0]:
+		checks["inequality"] = ((b_lb - A_lb @ x) / scale, lambda k: "row %d" % k)
+	return checks, r[:3*n].reshape(n, 3)
+
+
+def verify(struct, solution, tol=1e-6, worst=10):
+	'''Check solution, a Solution of struct, an intlinprog result of
+	struct.build_intlinprog() or its vector x.
+	@return a Verification with at most worst offenders'''
+	if isinstance(solution, Solution):
+		checks, residual = _verify_solution(struct, solution)
+	else:
+		x = solution.x if isinstance(solution, IntLinProgResult) else solution
+		if x is None:
+			raise ValueError("the result has no solution to verify")
+		checks, residual = _verify_vector(struct, x)
+
+	violations, offenders = {}, []
+	for kind, (values, name) in sorted(checks.items()):
+		violations[kind] = float(np.fmax(values, 0.0).max(initial=0.0))
+		top = np.argpartition(-values, worst)[:worst] if len(values) > worst else np.arange(len(values))
+		offenders += [(float(values[k]), kind, k, name) for k in top if values[k] > tol]
+	offenders.sort(key=lambda o: -o[0])
+	worst_offenders = [(kind, name(k), value) for value, kind, k, name in offenders[:worst]]
+	passed = all(v <= tol for v in violations.values())
+	return Verification(passed, tol, violations, worst_offenders, residual)
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description="Check the solutions of batch.py.")
+	parser.add_argument("instances", help="JSONL or NPZ file of instances")
+	parser.add_argument("results", help="JSONL file of results")
+	parser.add_argument("--tol", type=float, default=1e-6)
+	args = parser.parse_args(argv)
+	from analysis import Structure
+	from batch import read_instances
+	instances = {ident: (nodes, mass) for ident, nodes, mass in read_instances(args.instances)}
+	failed = 0
+	with open(args.results) as f:
+		for line in f:
+			if not line.strip():
+				continue
+			record = json.loads(line)
+			if record.get("objective") is None or record["id"] not in instances:
+				continue
+			check = verify(Structure(*instances[record["id"]]), Solution.from_dict(record), args.tol)
+			if not check.passed:
+				failed += 1
+				print("%s: %r %s" % (record["id"], check, check.worst[:3]))
+	print("%d failed" % failed, file=sys.stderr)
+	return 1 if failed else 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())